@@ -395,7 +395,8 @@ ${concept.description} <span style="color: #808080;">[${args_info}] (arity: ${co
     });
   }
 
-  $('mi').on('click', function() {
+  // delegated for the sections loaded later (--lazy-sections)
+  $(document).on('click', 'mi', function() {
     // if already selected, remove it
     let old_mi_id = sessionStorage.getItem('mi_id');
     if(old_mi_id != undefined) {
@@ -419,9 +420,16 @@ ${concept.description} <span style="color: #808080;">[${args_info}] (arity: ${co
   // This '$(window).scrollTop' seems redundant but somehow fixes the page position problems...
   $(window).scrollTop(localStorage['scroll_top']);
   let mi_id = sessionStorage['mi_id'];
-  if(mi_id != undefined) {
+  if(mi_id != undefined && $('#' + escape_selector(mi_id)).length > 0) {
     show_anno_box($('#' + escape_selector(mi_id)));
   }
+
+  // the selected mi may be in a section loaded later
+  $(document).on('miogatto:section-loaded', function(_, sec: JQuery) {
+    if(mi_id != undefined && sec.find('#' + escape_selector(mi_id)).length > 0) {
+      show_anno_box($('#' + escape_selector(mi_id)));
+    }
+  });
 });
 
 // --------------------------
@@ -679,6 +687,16 @@ $(function() {
   });
 });
 
+// the sections loaded after the start (--lazy-sections)
+$(document).on('miogatto:section-loaded', function(_, sec: JQuery) {
+  sec.find('mi').each(function() {
+    give_color($(this));
+    show_border($(this));
+  });
+  give_sog_highlight();
+  update_mi_list();
+});
+
 // --------------------------
 // Keybord shortcuts
 // --------------------------
@@ -727,9 +745,10 @@ let mi_list: JQuery[] = [];
 let mi_id2index: {[mi_id: string]: number} = {};
 
 // Update mi_list after loading html.
-$(function() {
+function update_mi_list() {
   // Load mi_list.
   mi_list = dfs_mis($(":root"));
+  mi_id2index = {};
 
   //console.log(mi_list);
 
@@ -744,6 +763,10 @@ $(function() {
       console.error(mi_list[i]);
     }
   }
+}
+
+$(function() {
+  update_mi_list();
 });
 
 // Search the next unannotated mi starting from start_index.
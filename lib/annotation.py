@@ -1,10 +1,12 @@
 # Annotation data handler
 import json
+import msgpack
 from pathlib import Path
-from logging import Logger
+from typing import Optional
 from dataclasses import asdict
 
 from lib.datatypes import MathConcept
+from lib.store import CorpusStore
 
 from lib.logger import main_logger
 
@@ -14,12 +16,88 @@ def dump_json(data, fp):
 
 logger = main_logger.getChild('annotation')
 
+
+class JsonStorage:
+    """The canonical storage (indented and key-sorted JSON)"""
+
+    suffix = '.json'
+
+    @staticmethod
+    def load(file: Path) -> dict:
+        with open(file, encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def dumps(data: dict) -> bytes:
+        return (json.dumps(data, ensure_ascii=False, indent=4, sort_keys=True, separators=(',', ': ')) + '\n').encode()
+
+    @staticmethod
+    def save(data: dict, file: Path) -> None:
+        with open(file, 'w') as f:
+            dump_json(data, f)
+
+
+class MsgpackStorage:
+    """Compact binary storage with MessagePack"""
+
+    suffix = '.msgpack'
+
+    @staticmethod
+    def load(file: Path) -> dict:
+        with open(file, 'rb') as f:
+            return msgpack.unpackb(f.read(), raw=False, strict_map_key=False)
+
+    @staticmethod
+    def dumps(data: dict) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    @staticmethod
+    def save(data: dict, file: Path) -> None:
+        with open(file, 'wb') as f:
+            f.write(MsgpackStorage.dumps(data))
+
+
+# available storage backends by name
+STORAGES = {
+    'json': JsonStorage,
+    'msgpack': MsgpackStorage,
+}
+
+
+def get_storage(file: Path):
+    """Select the storage backend by the file extension"""
+    for storage in STORAGES.values():
+        if file.suffix == storage.suffix:
+            return storage
+
+    raise ValueError('{}: Unsupported file extension for annotation data'.format(file))
+
+
+def data_files(data_dir: Path, paper_id: str, fmt: str = 'json') -> tuple[Path, Path]:
+    """Get the paths of the anno and mcdict files for a paper"""
+    if fmt not in STORAGES:
+        raise ValueError('Unknown data format: {}'.format(fmt))
+
+    suffix = STORAGES[fmt].suffix
+    anno_file = data_dir / '{}_anno{}'.format(paper_id, suffix)
+    mcdict_file = data_dir / '{}_mcdict{}'.format(paper_id, suffix)
+
+    return anno_file, mcdict_file
+
+
+def load_data(file: Path) -> dict:
+    return get_storage(file).load(file)
+
+
+def save_data(data: dict, file: Path) -> None:
+    get_storage(file).save(data, file)
+
 class MiAnno:
     """Math identifier annotation"""
 
-    def __init__(self, file: Path) -> None:
-        with open(file, encoding='utf-8') as f:
-            data = json.load(f)
+    def __init__(self, file: Path, data: Optional[dict] = None) -> None:
+        if data is None:
+            data = load_data(file)
 
         if data.get('_anno_version', '') != '1.0':
             logger.warning('%s: Annotation data version is incompatible', file)
@@ -29,25 +107,35 @@ class MiAnno:
         self.annotator: str = data.get('_annotator', 'unknown')
         self.occr: dict = data['mi_anno']
 
+        self.store: Optional[CorpusStore] = None
+        self.paper_id: Optional[str] = None
+
+    @classmethod
+    def from_store(cls, store: CorpusStore, paper_id: str) -> 'MiAnno':
+        mi_anno = cls(store.file, store.load_anno(paper_id))
+        mi_anno.store, mi_anno.paper_id = store, paper_id
+        return mi_anno
 
-    def dump(self) -> None:
-        with open(self.file, 'w') as f:
-            dump_json(
-                {
-                    '_anno_version': self.anno_version,
-                    '_annotator': self.annotator,
-                    'mi_anno': self.occr,
-                },
-                f,
-            )
+    def to_dict(self) -> dict:
+        return {
+            '_anno_version': self.anno_version,
+            '_annotator': self.annotator,
+            'mi_anno': self.occr,
+        }
+
+    def dump(self, file: Optional[Path] = None) -> None:
+        if file is None and self.store is not None:
+            self.store.save_anno(self.paper_id, self.to_dict())
+        else:
+            save_data(self.to_dict(), self.file if file is None else file)
 
 
 class McDict:
     """Math concept dictionariy"""
 
-    def __init__(self, file: Path) -> None:
-        with open(file, encoding='utf-8') as f:
-            data = json.load(f)
+    def __init__(self, file: Path, data: Optional[dict] = None) -> None:
+        if data is None:
+            data = load_data(file)
 
         if data.get('_mcdict_version', '') != '1.0':
             logger.warning('%s: Math concept dict version is incompatible', file)
@@ -67,7 +155,16 @@ class McDict:
         self.concepts = concepts
         self.surfaces = surfaces
 
-    def dump(self):
+        self.store: Optional[CorpusStore] = None
+        self.paper_id: Optional[str] = None
+
+    @classmethod
+    def from_store(cls, store: CorpusStore, paper_id: str) -> 'McDict':
+        mcdict = cls(store.file, store.load_mcdict(paper_id))
+        mcdict.store, mcdict.paper_id = store, paper_id
+        return mcdict
+
+    def to_dict(self) -> dict:
         concepts = dict()
         for idf_hex, s in self.surfaces.items():
             concepts[idf_hex] = {
@@ -78,12 +175,14 @@ class McDict:
             for idf_var, cls in self.concepts[idf_hex].items():
                 concepts[idf_hex]['identifiers'][idf_var] = [asdict(c) for c in cls]
 
-        with open(self.file, 'w') as f:
-            dump_json(
-                {
-                    '_author': self.author,
-                    '_mcdict_version': self.mcdict_version,
-                    'concepts': concepts,
-                },
-                f,
-            )
+        return {
+            '_author': self.author,
+            '_mcdict_version': self.mcdict_version,
+            'concepts': concepts,
+        }
+
+    def dump(self, file: Optional[Path] = None) -> None:
+        if file is None and self.store is not None:
+            self.store.save_mcdict(self.paper_id, self.to_dict())
+        else:
+            save_data(self.to_dict(), self.file if file is None else file)
@@ -0,0 +1,137 @@
+# Corpus-wide concept dictionary with SQLite
+import json
+import sqlite3
+import lxml.html
+from pathlib import Path
+from typing import Optional
+
+from lib.logger import main_logger
+from lib.util import get_mi2idf
+from lib.datatypes import MathConcept
+from lib.annotation import load_data, data_files
+
+logger = main_logger.getChild('concept_dict')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS papers (
+    paper_id TEXT PRIMARY KEY,
+    signature TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    paper_id TEXT NOT NULL,
+    idf_hex TEXT NOT NULL,
+    idf_var TEXT NOT NULL,
+    description TEXT NOT NULL,
+    arity INTEGER NOT NULL,
+    affixes TEXT NOT NULL,
+    nof_occr INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_paper ON entries (paper_id);
+CREATE INDEX IF NOT EXISTS entries_idf ON entries (idf_hex, idf_var);
+'''
+
+
+def file_signature(*files: Path) -> str:
+    """Cheap change detection with the sizes and the modification times"""
+    stats = [f.stat() if f.exists() else None for f in files]
+    return json.dumps([[s.st_size, s.st_mtime_ns] if s is not None else None for s in stats])
+
+
+class ConceptDict:
+    """Concepts of all the papers indexed by identifiers with frequencies
+
+    The contributions of each paper are kept separately, so that only the
+    changed papers are read on updates.
+    """
+
+    def __init__(self, file: Path) -> None:
+        self.file = file
+        self.conn = sqlite3.connect(str(file))
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def signatures(self) -> dict[str, str]:
+        return dict(self.conn.execute('SELECT paper_id, signature FROM papers'))
+
+    def remove_paper(self, paper_id: str) -> None:
+        with self.conn:
+            self.conn.execute('DELETE FROM entries WHERE paper_id = ?', (paper_id,))
+            self.conn.execute('DELETE FROM papers WHERE paper_id = ?', (paper_id,))
+
+    def update_paper(self, paper_id: str, mcdict: dict, anno: dict, mi2idf: dict, signature: str) -> None:
+        """Replace the concepts of a paper
+
+        The occurrences are counted for the identifiers in mi2idf.
+        """
+        nof_occr: dict = dict()
+        for mi_id, a in anno['mi_anno'].items():
+            idf = mi2idf.get(mi_id)
+            if a['concept_id'] is not None and idf is not None:
+                key = (idf['idf_hex'], idf['idf_var'], a['concept_id'])
+                nof_occr[key] = nof_occr.get(key, 0) + 1
+
+        rows = []
+        for idf_hex, obj in mcdict['concepts'].items():
+            for idf_var, cls in obj['identifiers'].items():
+                for concept_id, c in enumerate(cls):
+                    affixes = json.dumps(c['affixes'], ensure_ascii=False)
+                    n = nof_occr.get((idf_hex, idf_var, concept_id), 0)
+                    rows.append((paper_id, idf_hex, idf_var, c['description'], c['arity'], affixes, n))
+
+        with self.conn:
+            self.conn.execute('DELETE FROM entries WHERE paper_id = ?', (paper_id,))
+            self.conn.executemany('INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            self.conn.execute('INSERT OR REPLACE INTO papers VALUES (?, ?)', (paper_id, signature))
+
+    def update(self, data_dir: Path, sources_dir: Path, fmt: str = 'json') -> tuple[int, int]:
+        """Read the changed papers in the data dir and drop the removed ones"""
+        signatures = self.signatures()
+        updated = 0
+
+        suffix = data_files(data_dir, '', fmt)[1].name
+        paper_ids = sorted(f.name[: -len(suffix)] for f in data_dir.glob('*' + suffix))
+
+        for paper_id in paper_ids:
+            anno_file, mcdict_file = data_files(data_dir, paper_id, fmt)
+            source_html = sources_dir / '{}.html'.format(paper_id)
+
+            # the anno file may not be created yet
+            if not anno_file.exists():
+                logger.warning('Skipped paper "%s": %s does not exist', paper_id, anno_file)
+                continue
+
+            signature = file_signature(anno_file, mcdict_file, source_html)
+            if signatures.get(paper_id) == signature:
+                continue
+
+            # identifiers are only available in the source HTML
+            mi2idf = get_mi2idf(lxml.html.parse(str(source_html))) if source_html.exists() else dict()
+            self.update_paper(paper_id, load_data(mcdict_file), load_data(anno_file), mi2idf, signature)
+            logger.debug('Updated paper "%s"', paper_id)
+            updated += 1
+
+        removed = signatures.keys() - set(paper_ids)
+        for paper_id in removed:
+            self.remove_paper(paper_id)
+            logger.debug('Removed paper "%s"', paper_id)
+
+        return updated, len(removed)
+
+    def variations(self, idf_hex: str) -> list[str]:
+        cur = self.conn.execute('SELECT DISTINCT idf_var FROM entries WHERE idf_hex = ? ORDER BY idf_var', (idf_hex,))
+        return [r[0] for r in cur]
+
+    def lookup(self, idf_hex: str, idf_var: str, limit: Optional[int] = None) -> list[tuple[MathConcept, int, int]]:
+        """Get the concepts of an identifier with the numbers of papers and occurrences (most frequent first)"""
+        cur = self.conn.execute(
+            '''SELECT description, arity, affixes, COUNT(DISTINCT paper_id) AS nof_papers, SUM(nof_occr) AS nof_occr
+            FROM entries WHERE idf_hex = ? AND idf_var = ?
+            GROUP BY description, arity, affixes
+            ORDER BY nof_papers DESC, nof_occr DESC, description
+            LIMIT ?''',
+            (idf_hex, idf_var, -1 if limit is None else limit),
+        )
+
+        return [(MathConcept(d, a, json.loads(af)), nof_papers, nof_occr) for d, a, af, nof_papers, nof_occr in cur]
@@ -0,0 +1,99 @@
+# Context window index of the occurrences
+import json
+from pathlib import Path
+from typing import Optional
+
+CONTEXT_VERSION = '1.0'
+
+
+def context_file(sources_dir: Path, paper_id: str) -> Path:
+    return sources_dir / '{}.context.json'.format(paper_id)
+
+
+def is_paragraph(e) -> bool:
+    # word containers and LaTeXML paragraphs (for display equations)
+    if e.get('id') is None:
+        return False
+
+    return 'ltx_para' in e.get('class', '').split() or e.find('span[@class="gd_word"]') is not None
+
+
+class ContextIndex:
+    """The enclosing paragraph and the position of each mi element
+
+    Positions are the ordinals of the gd_word spans in the document; the
+    position of an mi element is the number of the words preceding it. Each
+    paragraph has the range [start, end) of its words.
+    """
+
+    def __init__(self, paragraphs: list, occurrences: dict, nof_words: int) -> None:
+        self.paragraphs = paragraphs
+        self.occurrences = occurrences
+        self.nof_words = nof_words
+
+    @classmethod
+    def build(cls, tree) -> 'ContextIndex':
+        """Build the index from a tree with the word ids (i.e., not compacted)"""
+        root = tree.getroot()
+
+        word_pos, mi_pos = dict(), dict()
+        for e in root.iter('span', 'mi'):
+            if e.tag == 'mi':
+                mi_pos[e] = len(word_pos)
+            elif e.get('class') == 'gd_word':
+                word_pos[e.get('id')] = len(word_pos)
+
+        paragraphs: list = []
+        para_idx: dict = dict()
+        occurrences = dict()
+
+        for mi, pos in mi_pos.items():
+            mi_id = mi.get('id')
+            if mi_id is None:
+                continue
+
+            para = next((a for a in mi.iterancestors() if is_paragraph(a)), None)
+            if para is None:
+                occurrences[mi_id] = [-1, pos]
+                continue
+
+            para_id = para.get('id')
+            if para_id not in para_idx:
+                words = para.xpath('.//span[@class="gd_word"]')
+                start = word_pos[words[0].get('id')] if len(words) > 0 else pos
+                para_idx[para_id] = len(paragraphs)
+                paragraphs.append([para_id, start, start + len(words)])
+
+            occurrences[mi_id] = [para_idx[para_id], pos]
+
+        return cls(paragraphs, occurrences, len(word_pos))
+
+    @classmethod
+    def load(cls, file: Path) -> 'ContextIndex':
+        with open(file, encoding='utf-8') as f:
+            data = json.load(f)
+
+        return cls(data['paragraphs'], data['occurrences'], data['nof_words'])
+
+    def dump(self, file: Path) -> None:
+        data = {
+            '_context_version': CONTEXT_VERSION,
+            'paragraphs': self.paragraphs,
+            'occurrences': self.occurrences,
+            'nof_words': self.nof_words,
+        }
+
+        # compact since this is not meant to be edited
+        with open(file, 'w') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+    def paragraph(self, mi_id: str) -> Optional[str]:
+        idx = self.occurrences[mi_id][0]
+        return self.paragraphs[idx][0] if idx >= 0 else None
+
+    def window(self, mi_id: str, size: int) -> tuple[int, int, int]:
+        """Get the word range (start, position of the mi, end) of the context within the paragraph"""
+        idx, pos = self.occurrences[mi_id]
+        lower, upper = (self.paragraphs[idx][1], self.paragraphs[idx][2]) if idx >= 0 else (0, self.nof_words)
+
+        return max(pos - size, lower), pos, min(pos + size, upper)
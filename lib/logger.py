@@ -1,29 +1,103 @@
 # Custom logger
+import json
+import queue
+import atexit
 import logging as log
+from logging.handlers import QueueHandler, QueueListener
 
+# the arguments which can be formatted later safely
+IMMUTABLE_ARGS = (str, bytes, int, float, complex, type(None))
 
-def __set_logger(self, quiet: bool, debug: bool):
+
+class LazyQueueHandler(QueueHandler):
+    """Queue handler leaving the message formatting to the listener thread
+
+    The message is formatted eagerly if any argument may be modified before
+    the listener formats it.
+    """
+
+    def prepare(self, record):
+        args = record.args.values() if isinstance(record.args, dict) else record.args or ()
+        if not all(isinstance(a, IMMUTABLE_ARGS) for a in args):
+            record.msg, record.args = record.getMessage(), None
+
+        # tracebacks cannot be formatted later
+        if record.exc_info:
+            record.exc_text = log.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+class JsonFormatter(log.Formatter):
+    """Formatter for JSON lines"""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'name': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        if record.exc_text:
+            data['exception'] = record.exc_text
+
+        return json.dumps(data, ensure_ascii=False)
+
+
+def __set_logger(self, quiet: bool, debug: bool, json_lines: bool = False, background: bool = True):
     level = log.INFO
     if quiet:
         level = log.WARN
     if debug:
         level = log.DEBUG
 
-    # use stream handler
+    # use stream handler in the background (unless in a worker process)
     handler = log.StreamHandler()
-    formatter = log.Formatter('%(name)s %(levelname)s: %(message)s')
+    if json_lines:
+        formatter = JsonFormatter()
+    else:
+        formatter = log.Formatter('%(name)s %(levelname)s: %(message)s')
 
     # apply settings
     handler.setLevel(level)
     handler.setFormatter(formatter)
 
+    # replace the previous settings if any
+    listener = getattr(self, 'listener', None)
+    if listener is not None:
+        atexit.unregister(listener.stop)
+        # a worker process has inherited the listener, but not its thread
+        if background:
+            listener.stop()
+    for h in list(self.handlers):
+        self.removeHandler(h)
+
     self.setLevel(level)
-    self.addHandler(handler)
     self.propagate = False
+    self.settings = (quiet, debug, json_lines)
+
+    if not background:
+        self.listener = None
+        self.addHandler(handler)
+        return
+
+    q = queue.SimpleQueue()
+    self.listener = QueueListener(q, handler, respect_handler_level=True)
+    self.listener.start()
+    atexit.register(self.listener.stop)
+
+    self.addHandler(LazyQueueHandler(q))
 
 
 def get_logger(name: str):
     log.Logger.set_logger = __set_logger
     return log.getLogger(name)
 
+
 main_logger = get_logger('miogatto')
+
+
+def init_worker(quiet: bool, debug: bool, json_lines: bool) -> None:
+    """Initializer of the worker processes, which have no listener thread"""
+    main_logger.set_logger(quiet, debug, json_lines, background=False)
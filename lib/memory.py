@@ -0,0 +1,89 @@
+# Memory accounting facility
+import sys
+import tracemalloc
+from typing import Optional
+
+# allocations by the tracing machinery itself are not interesting
+IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>')
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """Approximate size of an object including the referenced containers and objects
+
+    Shared objects are counted only once. lxml elements are not followed.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    elif hasattr(obj, '__dict__') and not hasattr(obj, 'getroottree'):
+        size += deep_sizeof(vars(obj), seen)
+
+    return size
+
+
+def peak_rss() -> Optional[int]:
+    """Peak resident set size of the process in bytes (None if unavailable)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # in kilobytes on Linux, in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class AllocationTracer:
+    """Traced memory and the top allocations since the last snapshot with tracemalloc"""
+
+    def __init__(self, nframes: int = 1) -> None:
+        self.nframes = nframes
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+        self.snapshot = self.take_snapshot()
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self.snapshot = None
+
+    @staticmethod
+    def take_snapshot() -> tracemalloc.Snapshot:
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces([tracemalloc.Filter(False, f) for f in IGNORED_FILES])
+
+    @staticmethod
+    def usage() -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {'current': current, 'peak': peak}
+
+    def top_diff(self, limit: int = 10, reset: bool = False) -> list[dict]:
+        """The allocation sites with the largest changes since the last snapshot"""
+        snapshot = self.take_snapshot()
+        stats = snapshot.compare_to(self.snapshot, 'lineno') if self.snapshot is not None else []
+        if reset:
+            self.snapshot = snapshot
+
+        return [
+            {
+                'location': '{}:{}'.format(s.traceback[0].filename, s.traceback[0].lineno),
+                'size': s.size,
+                'size_diff': s.size_diff,
+                'count': s.count,
+                'count_diff': s.count_diff,
+            }
+            for s in stats[:limit]
+        ]
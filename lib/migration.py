@@ -0,0 +1,97 @@
+# Versioned migration of the annotation data
+from copy import deepcopy
+from typing import Callable, Optional
+
+# the current versions of the data
+LATEST = {
+    'anno': '1.0',
+    'mcdict': '1.0',
+}
+
+# kind -> source version -> (target version, step function)
+STEPS: dict[str, dict[str, tuple[str, Callable[[dict], dict]]]] = {kind: dict() for kind in LATEST}
+
+
+def migration_step(kind: str, source: str, target: str):
+    """Register a function migrating the data of the kind from source to target version"""
+
+    def register(func):
+        if source in STEPS[kind]:
+            raise ValueError('Duplicated migration step for {} {}'.format(kind, source))
+
+        STEPS[kind][source] = (target, func)
+        return func
+
+    return register
+
+
+def get_version(kind: str, data: dict) -> str:
+    # the metadata keys are prefixed with _ since 1.0
+    for key in ('_{}_version', '{}_version'):
+        version = data.get(key.format(kind))
+        if version is not None:
+            return version
+
+    return 'unknown'
+
+
+def migration_path(kind: str, source: str, target: Optional[str] = None) -> list[str]:
+    """Get the versions to go through (including source and target)"""
+    if target is None:
+        target = LATEST[kind]
+
+    path = [source]
+    while path[-1] != target:
+        if path[-1] not in STEPS[kind]:
+            raise ValueError('No migration path for {} from {} to {}'.format(kind, source, target))
+
+        path.append(STEPS[kind][path[-1]][0])
+
+    return path
+
+
+def migrate(kind: str, data: dict, target: Optional[str] = None) -> tuple[dict, list[str]]:
+    """Apply the migration steps without modifying the given data"""
+    path = migration_path(kind, get_version(kind, data), target)
+
+    data = deepcopy(data)
+    for version in path[:-1]:
+        data = STEPS[kind][version][1](data)
+
+    return data, path
+
+
+@migration_step('anno', '0.2', '1.0')
+def migrate_anno_02to10(data: dict) -> dict:
+    # metadata
+    annotator = data['annotator']
+    del data['anno_version']
+    del data['annotator']
+    data['_anno_version'] = '1.0'
+    data['_annotator'] = annotator
+
+    # data update
+    for mi in data['mi_anno'].values():
+        mi['sog'] = [{'start': tp[0], 'stop': tp[1], 'type': 0} for tp in mi['sog']]
+
+    return data
+
+
+@migration_step('mcdict', '0.2', '1.0')
+def migrate_mcdict_02to10(data: dict) -> dict:
+    # metadata
+    author = data['annotator']
+    del data['mcdict_version']
+    del data['annotator']
+    data['_mcdict_version'] = '1.0'
+    data['_author'] = author
+
+    # data update
+    for obj in data['concepts'].values():
+        obj['_surface'] = obj.pop('surface')
+
+        for concept_ls in obj['identifiers'].values():
+            for concept in concept_ls:
+                concept['affixes'] = concept.pop('args_type')
+
+    return data
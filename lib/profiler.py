@@ -0,0 +1,161 @@
+# Profiling facility for the tools
+import sys
+import time
+import atexit
+import cProfile
+import threading
+import tracemalloc
+from pathlib import Path
+from collections import Counter
+from typing import Optional
+
+from lib.logger import main_logger
+from lib.memory import AllocationTracer, peak_rss
+
+logger = main_logger.getChild('profiler')
+
+# file extensions for flamegraph-compatible collapsed stacks
+COLLAPSED_SUFFIXES = ('.folded', '.collapsed')
+
+# number of the allocation sites to show
+MEMORY_TOP = 10
+
+
+class StackSampler:
+    """Sample the stack of a thread periodically and count collapsed stacks"""
+
+    def __init__(self, interval: float = 0.001) -> None:
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.counts: Counter = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append('{} ({}:{})'.format(code.co_name, Path(code.co_filename).name, code.co_firstlineno))
+                frame = frame.f_back
+
+            self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+    def dump(self, file: Path) -> None:
+        with open(file, 'w') as f:
+            for stack, count in self.counts.most_common():
+                f.write('{} {}\n'.format(stack, count))
+
+
+class Profiler:
+    """Phase timers and optional cProfile/sampling profiler and memory tracer
+
+    The results are written when the process exits (including exit()).
+    """
+
+    def __init__(self, profile_file: Optional[str] = None, timings: bool = False, memory: bool = False) -> None:
+        self.profile_file = Path(profile_file) if profile_file is not None else None
+        self.timings = timings
+        self.tracer = AllocationTracer() if memory else None
+
+        self.phases: dict[str, float] = dict()
+        self.phase_memory: dict[str, dict] = dict()
+        self.cur_phase: Optional[str] = None
+        self.t_phase = 0.0
+        self.profiler = None
+        self.sampler = None
+        self.t_start = 0.0
+
+    @classmethod
+    def from_args(cls, args: dict, prog_name: str) -> 'Profiler':
+        """Make a profiler from the common options of the tools
+
+        docopt has no optional option values, so --profile dumps the profile
+        into <prog_name>.prof and --profile-out=FILE chooses the file.
+        """
+        profile_file = args['--profile-out']
+        if profile_file is None and args['--profile']:
+            profile_file = '{}.prof'.format(prog_name)
+
+        return cls(profile_file, args['--timings'], args['--memory'])
+
+    def start(self) -> None:
+        self.t_start = time.perf_counter()
+
+        if self.tracer is not None:
+            self.tracer.start()
+
+        if self.profile_file is not None:
+            if self.profile_file.suffix in COLLAPSED_SUFFIXES:
+                self.sampler = StackSampler()
+                self.sampler.start()
+            else:
+                self.profiler = cProfile.Profile()
+                self.profiler.enable()
+
+        atexit.register(self.stop)
+
+    def phase(self, name: Optional[str]) -> None:
+        """End the current phase and begin the next one (if any)"""
+        t = time.perf_counter()
+
+        if self.cur_phase is not None:
+            self.phases[self.cur_phase] = self.phases.get(self.cur_phase, 0.0) + t - self.t_phase
+
+            # the memory at the end of the phase and the peak during the phase
+            if self.tracer is not None:
+                self.phase_memory[self.cur_phase] = self.tracer.usage()
+                tracemalloc.reset_peak()
+
+        self.cur_phase, self.t_phase = name, time.perf_counter()
+
+    def stop(self) -> None:
+        atexit.unregister(self.stop)
+        self.phase(None)
+        total = time.perf_counter() - self.t_start
+
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(str(self.profile_file))
+            logger.info('Wrote cProfile stats to %s', self.profile_file)
+
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler.dump(self.profile_file)
+            logger.info('Wrote collapsed stacks to %s', self.profile_file)
+
+        if self.timings:
+            print('* Timings', file=sys.stderr)
+            for name, t in self.phases.items():
+                print('{}: {:.3f} s'.format(name, t), file=sys.stderr)
+            print('total: {:.3f} s'.format(total), file=sys.stderr)
+
+        if self.tracer is not None:
+            self.print_memory()
+
+    def print_memory(self) -> None:
+        def mib(size: int) -> str:
+            return '{:.1f} MiB'.format(size / 2**20)
+
+        print('* Memory', file=sys.stderr)
+        for name, usage in self.phase_memory.items():
+            print('{}: {} (peak {})'.format(name, mib(usage['current']), mib(usage['peak'])), file=sys.stderr)
+
+        rss = peak_rss()
+        if rss is not None:
+            print('peak RSS: {}'.format(mib(rss)), file=sys.stderr)
+
+        print('* Top allocations', file=sys.stderr)
+        for s in self.tracer.top_diff(MEMORY_TOP):
+            diff = '{:+.1f} KiB ({:+d} blocks)'.format(s['size_diff'] / 1024, s['count_diff'])
+            print('{}: {}'.format(s['location'], diff), file=sys.stderr)
+        self.tracer.stop()
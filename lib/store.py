@@ -0,0 +1,239 @@
+# Corpus-wide annotation store with SQLite
+import json
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from lib.logger import main_logger
+
+logger = main_logger.getChild('store')
+
+# Note: columns without type (e.g., sog.type) keep the values as they are
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS papers (
+    paper_id TEXT PRIMARY KEY,
+    anno_version TEXT,
+    annotator TEXT,
+    mcdict_version TEXT,
+    author TEXT
+);
+CREATE TABLE IF NOT EXISTS occurrences (
+    paper_id TEXT NOT NULL,
+    mi_id TEXT NOT NULL,
+    idf_hex TEXT,
+    idf_var TEXT,
+    concept_id INTEGER,
+    PRIMARY KEY (paper_id, mi_id)
+);
+CREATE TABLE IF NOT EXISTS sogs (
+    paper_id TEXT NOT NULL,
+    mi_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    start TEXT NOT NULL,
+    stop TEXT NOT NULL,
+    type,
+    PRIMARY KEY (paper_id, mi_id, idx)
+);
+CREATE TABLE IF NOT EXISTS surfaces (
+    paper_id TEXT NOT NULL,
+    idf_hex TEXT NOT NULL,
+    surface TEXT NOT NULL,
+    PRIMARY KEY (paper_id, idf_hex)
+);
+CREATE TABLE IF NOT EXISTS identifiers (
+    paper_id TEXT NOT NULL,
+    idf_hex TEXT NOT NULL,
+    idf_var TEXT NOT NULL,
+    PRIMARY KEY (paper_id, idf_hex, idf_var)
+);
+CREATE TABLE IF NOT EXISTS concepts (
+    paper_id TEXT NOT NULL,
+    idf_hex TEXT NOT NULL,
+    idf_var TEXT NOT NULL,
+    concept_id INTEGER NOT NULL,
+    description TEXT,
+    arity INTEGER,
+    affixes TEXT,
+    PRIMARY KEY (paper_id, idf_hex, idf_var, concept_id)
+);
+CREATE INDEX IF NOT EXISTS occurrences_idf ON occurrences (idf_hex, idf_var);
+CREATE INDEX IF NOT EXISTS occurrences_concept ON occurrences (paper_id, idf_hex, idf_var, concept_id);
+CREATE INDEX IF NOT EXISTS concepts_idf ON concepts (idf_hex, idf_var);
+'''
+
+
+class CorpusStore:
+    """Annotation data of a whole corpus in a single SQLite file"""
+
+    def __init__(self, file: Path) -> None:
+        self.file = file
+        self.conn = sqlite3.connect(str(file), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def papers(self) -> list[str]:
+        return [r[0] for r in self.conn.execute('SELECT paper_id FROM papers ORDER BY paper_id')]
+
+    def __contains__(self, paper_id: str) -> bool:
+        row = self.conn.execute('SELECT 1 FROM papers WHERE paper_id = ?', (paper_id,)).fetchone()
+        return row is not None
+
+    def _set_meta(self, paper_id: str, **meta) -> None:
+        self.conn.execute('INSERT OR IGNORE INTO papers (paper_id) VALUES (?)', (paper_id,))
+        for k, v in meta.items():
+            self.conn.execute('UPDATE papers SET {} = ? WHERE paper_id = ?'.format(k), (v, paper_id))
+
+    def _get_meta(self, paper_id: str, *keys) -> tuple:
+        row = self.conn.execute('SELECT {} FROM papers WHERE paper_id = ?'.format(', '.join(keys)), (paper_id,))
+        meta = row.fetchone()
+        if meta is None:
+            raise KeyError(paper_id)
+
+        return meta
+
+    # the same structure as the anno JSON files
+    def load_anno(self, paper_id: str) -> dict:
+        anno_version, annotator = self._get_meta(paper_id, 'anno_version', 'annotator')
+
+        occr = dict()
+        cur = self.conn.execute('SELECT mi_id, concept_id FROM occurrences WHERE paper_id = ?', (paper_id,))
+        for mi_id, concept_id in cur:
+            occr[mi_id] = {'concept_id': concept_id, 'sog': []}
+
+        cur = self.conn.execute(
+            'SELECT mi_id, start, stop, type FROM sogs WHERE paper_id = ? ORDER BY mi_id, idx', (paper_id,)
+        )
+        for mi_id, start, stop, sog_type in cur:
+            occr[mi_id]['sog'].append({'start': start, 'stop': stop, 'type': sog_type})
+
+        return {'_anno_version': anno_version, '_annotator': annotator, 'mi_anno': occr}
+
+    def save_anno(self, paper_id: str, data: dict, mi2idf: Optional[dict] = None) -> None:
+        """Replace the annotation of a paper
+
+        The identifier of each occurrence is taken from mi2idf if given,
+        otherwise the one already in the store is kept.
+        """
+        with self.conn:
+            if mi2idf is None:
+                cur = self.conn.execute(
+                    'SELECT mi_id, idf_hex, idf_var FROM occurrences WHERE paper_id = ?', (paper_id,)
+                )
+                idfs = {mi_id: (idf_hex, idf_var) for mi_id, idf_hex, idf_var in cur}
+            else:
+                idfs = {
+                    mi_id: (idf['idf_hex'], idf['idf_var']) for mi_id, idf in mi2idf.items() if idf is not None
+                }
+
+            self._set_meta(paper_id, anno_version=data['_anno_version'], annotator=data['_annotator'])
+            self.conn.execute('DELETE FROM occurrences WHERE paper_id = ?', (paper_id,))
+            self.conn.execute('DELETE FROM sogs WHERE paper_id = ?', (paper_id,))
+
+            self.conn.executemany(
+                'INSERT INTO occurrences VALUES (?, ?, ?, ?, ?)',
+                (
+                    (paper_id, mi_id, *idfs.get(mi_id, (None, None)), anno['concept_id'])
+                    for mi_id, anno in data['mi_anno'].items()
+                ),
+            )
+            self.conn.executemany(
+                'INSERT INTO sogs VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    (paper_id, mi_id, idx, sog['start'], sog['stop'], sog['type'])
+                    for mi_id, anno in data['mi_anno'].items()
+                    for idx, sog in enumerate(anno['sog'])
+                ),
+            )
+
+    # the same structure as the mcdict JSON files
+    def load_mcdict(self, paper_id: str) -> dict:
+        mcdict_version, author = self._get_meta(paper_id, 'mcdict_version', 'author')
+
+        concepts = dict()
+        cur = self.conn.execute('SELECT idf_hex, surface FROM surfaces WHERE paper_id = ?', (paper_id,))
+        for idf_hex, surface in cur:
+            concepts[idf_hex] = {'_surface': json.loads(surface), 'identifiers': dict()}
+
+        cur = self.conn.execute('SELECT idf_hex, idf_var FROM identifiers WHERE paper_id = ?', (paper_id,))
+        for idf_hex, idf_var in cur:
+            concepts[idf_hex]['identifiers'][idf_var] = []
+
+        cur = self.conn.execute(
+            'SELECT idf_hex, idf_var, description, arity, affixes FROM concepts WHERE paper_id = ? '
+            'ORDER BY idf_hex, idf_var, concept_id',
+            (paper_id,),
+        )
+        for idf_hex, idf_var, description, arity, affixes in cur:
+            concepts[idf_hex]['identifiers'][idf_var].append(
+                {'description': description, 'arity': arity, 'affixes': json.loads(affixes)}
+            )
+
+        return {'_author': author, '_mcdict_version': mcdict_version, 'concepts': concepts}
+
+    def save_mcdict(self, paper_id: str, data: dict) -> None:
+        """Replace the math concept dictionary of a paper"""
+        with self.conn:
+            self._set_meta(paper_id, mcdict_version=data['_mcdict_version'], author=data['_author'])
+            for table in ('surfaces', 'identifiers', 'concepts'):
+                self.conn.execute('DELETE FROM {} WHERE paper_id = ?'.format(table), (paper_id,))
+
+            concepts = data['concepts']
+            self.conn.executemany(
+                'INSERT INTO surfaces VALUES (?, ?, ?)',
+                (
+                    (paper_id, idf_hex, json.dumps(obj['_surface'], ensure_ascii=False))
+                    for idf_hex, obj in concepts.items()
+                ),
+            )
+            self.conn.executemany(
+                'INSERT INTO identifiers VALUES (?, ?, ?)',
+                ((paper_id, idf_hex, idf_var) for idf_hex, obj in concepts.items() for idf_var in obj['identifiers']),
+            )
+            self.conn.executemany(
+                'INSERT INTO concepts VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    (
+                        paper_id,
+                        idf_hex,
+                        idf_var,
+                        concept_id,
+                        c['description'],
+                        c['arity'],
+                        json.dumps(c['affixes'], ensure_ascii=False),
+                    )
+                    for idf_hex, obj in concepts.items()
+                    for idf_var, cls in obj['identifiers'].items()
+                    for concept_id, c in enumerate(cls)
+                ),
+            )
+
+    # queries
+    def find_occurrences(
+        self, idf_hex: str, idf_var: Optional[str] = None, concept_id: Optional[int] = None
+    ) -> list[tuple]:
+        """Find (paper_id, mi_id, idf_var, concept_id) of an identifier"""
+        query = 'SELECT paper_id, mi_id, idf_var, concept_id FROM occurrences WHERE idf_hex = ?'
+        params: list = [idf_hex]
+
+        if idf_var is not None:
+            query += ' AND idf_var = ?'
+            params.append(idf_var)
+
+        if concept_id is not None:
+            query += ' AND concept_id = ?'
+            params.append(concept_id)
+
+        return self.conn.execute(query + ' ORDER BY paper_id, mi_id', params).fetchall()
+
+    def progress(self, below: Optional[float] = None) -> list[tuple]:
+        """Get (paper_id, #done, #occurrences) of each paper"""
+        query = 'SELECT paper_id, COUNT(concept_id), COUNT(*) FROM occurrences GROUP BY paper_id'
+        params: list = []
+
+        if below is not None:
+            query += ' HAVING COUNT(concept_id) * 100.0 < ? * COUNT(*)'
+            params.append(below)
+
+        return self.conn.execute(query + ' ORDER BY paper_id', params).fetchall()
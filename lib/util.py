@@ -1,41 +1,133 @@
 # Common utilities
+import json
+from pathlib import Path
+from types import MappingProxyType
+from typing import Optional
 
+DEFAULT_IDF_TABLE = Path(__file__).parent / 'idf_table.json'
 
-def get_mi2idf(tree):
+
+class IdfTable:
+    """Classification table for math identifiers
+
+    The table consists of the set of non-identifier hexcodes (e.g., ellipses)
+    and the mapping to normalize mathvariant values. The result is cached for
+    each distinct pair of (text, mathvariant).
+    """
+
+    def __init__(self, non_identifiers, variants) -> None:
+        self.non_identifiers = frozenset(non_identifiers)
+        self.variants = MappingProxyType(dict(variants))
+        self._cache: dict = dict()
+
+    @classmethod
+    def load(cls, file: Path) -> 'IdfTable':
+        with open(file, encoding='utf-8') as f:
+            data = json.load(f)
+
+        return cls(data.get('non_identifiers', dict()), data.get('variants', dict()))
+
+    def classify(self, text: str, mathvariant: Optional[str]) -> Optional[tuple[str, str]]:
+        """Return (idf_hex, idf_var), or None for non-identifiers"""
+        key = (text, mathvariant)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+
+        idf_hex = text.encode().hex()
+
+        if idf_hex in self.non_identifiers:
+            idf = None
+        else:
+            # Note: mathvariant is replaced (None -> default, normal -> roman)
+            idf_var = mathvariant if mathvariant is not None else 'default'
+            idf = (idf_hex, self.variants.get(idf_var, idf_var))
+
+        self._cache[key] = idf
+        return idf
+
+
+_default_idf_table: Optional[IdfTable] = None
+
+
+def get_idf_table() -> IdfTable:
+    # load the table only once
+    global _default_idf_table
+    if _default_idf_table is None:
+        _default_idf_table = IdfTable.load(DEFAULT_IDF_TABLE)
+
+    return _default_idf_table
+
+
+def get_mi2idf(tree, idf_table: Optional[IdfTable] = None):
     root = tree.getroot()
     mi2idf = dict()
 
-    # dirty settings
-    non_identifiers = [
-        'e280a6',  # HORIZONTAL ELLIPSIS (…)
-        'e28baf',  # MIDLINE HORIZONTAL ELLIPSIS (⋯)
-        'e28bae',  # VERTICAL ELLIPSIS (⋮)
-        'e28bb1',  # DOWN RIGHT DIAGONAL ELLIPSIS (⋱)
-        'e296a1',  # QED BOX (□)
-    ]
+    if idf_table is None:
+        idf_table = get_idf_table()
 
     # loop mi in the tree
-    for e in root.xpath('//mi'):
+    for e in root.iter('mi'):
         mi_id = e.attrib.get('id')
 
         # skip if empty
         if e.text is None:
             continue
 
-        # get idf hex
-        idf_hex = e.text.encode().hex()
-
         # None if non-identifiers
-        if idf_hex in non_identifiers:
+        idf = idf_table.classify(e.text, e.attrib.get('mathvariant'))
+        if idf is None:
             mi2idf[mi_id] = None
             continue
 
-        # detect the idf variant
-        # Note: mathvariant is replaced (None -> default, normal -> roman)
-        idf_var = e.attrib.get('mathvariant', 'default')
-        if idf_var == 'normal':
-            idf_var = 'roman'
-
-        mi2idf[mi_id] = {'idf_hex': idf_hex, 'idf_var': idf_var}
+        mi2idf[mi_id] = {'idf_hex': idf[0], 'idf_var': idf[1]}
 
     return mi2idf
+
+
+def compact_word_spans(root):
+    """Convert the word span tags into the compact form
+
+    The ids of the words and the span tags for spaces are dropped. The ids
+    can be recovered from the ordinals with expand_word_spans.
+    """
+    for e in root.xpath('//span[@class="gd_word"][@id]'):
+        parent = e.getparent()
+        if parent.get('data-gd-parent') is None:
+            parent_id = e.attrib['id'].rsplit('.', 2)[0]
+            parent.attrib['data-gd-parent'] = parent_id
+
+        del e.attrib['id']
+        if e.text is None:
+            # avoid self-closing tags for empty words
+            e.text = ''
+
+        # replace the following span for a space with a plain space
+        s = e.getnext()
+        if s is not None and s.tag == 'span' and len(s.attrib) == 0 and s.text == ' ' and len(s) == 0:
+            e.tail = ' '
+            parent.remove(s)
+
+
+def expand_word_spans(root, spaces: bool = True):
+    """Recover the ids (and the span tags for spaces) of the compact form"""
+    from lxml.html.builder import SPAN
+
+    for parent in root.xpath('//*[@data-gd-parent]'):
+        parent_id = parent.attrib.pop('data-gd-parent')
+
+        chunk, word_cnt = 1, 0
+        for c in list(parent):
+            if c.tag != 'span' or c.get('class') != 'gd_word':
+                chunk, word_cnt = chunk + 1, 0
+                continue
+
+            word_cnt += 1
+            c.attrib['id'] = '{}.{}.w{}'.format(parent_id, chunk, word_cnt)
+            if c.text is None:
+                c.text = ''
+
+            if spaces and c.tail == ' ':
+                c.tail = None
+                c.addnext(SPAN(' '))
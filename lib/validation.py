@@ -0,0 +1,148 @@
+# Validation of the annotation data
+from dataclasses import fields
+
+from lib.datatypes import MathConcept
+
+# expected fields of the concepts
+CONCEPT_FIELDS = {f.name for f in fields(MathConcept)}
+
+# declaration, definition and others (the server may store them as str)
+SOG_TYPES = ('0', '1', '2')
+
+
+def is_concept_id(x) -> bool:
+    return x is None or (type(x) is int and x >= 0)
+
+
+def is_sog(x) -> bool:
+    return type(x) is dict and set(x.keys()) == {'start', 'stop', 'type'} and all(
+        type(x[k]) is str for k in ('start', 'stop')
+    )
+
+
+def validate_anno(data: dict) -> list[str]:
+    """Check the structure of the annotation data (version 1.0)"""
+    issues = []
+
+    if type(data) is not dict:
+        return ['Malformed annotation data']
+
+    if data.get('_anno_version') != '1.0':
+        issues.append('Unsupported anno version: {}'.format(data.get('_anno_version')))
+    if type(data.get('_annotator')) is not str:
+        issues.append('Annotator is missing')
+
+    occr = data.get('mi_anno')
+    if type(occr) is not dict:
+        issues.append('mi_anno is missing')
+        return issues
+
+    for mi_id, anno in occr.items():
+        if type(anno) is not dict or 'concept_id' not in anno or type(anno.get('sog')) is not list:
+            issues.append('{}: Malformed annotation'.format(mi_id))
+            continue
+
+        if not is_concept_id(anno['concept_id']):
+            issues.append('{}: Invalid concept_id {!r}'.format(mi_id, anno['concept_id']))
+
+        for sog in anno['sog']:
+            if not is_sog(sog):
+                issues.append('{}: Malformed SoG {!r}'.format(mi_id, sog))
+            elif str(sog['type']) not in SOG_TYPES:
+                issues.append('{}: Invalid SoG type {!r}'.format(mi_id, sog['type']))
+
+    return issues
+
+
+def validate_mcdict(data: dict) -> list[str]:
+    """Check the structure of the math concept dictionary (version 1.0)"""
+    issues = []
+
+    if type(data) is not dict:
+        return ['Malformed mcdict']
+
+    if data.get('_mcdict_version') != '1.0':
+        issues.append('Unsupported mcdict version: {}'.format(data.get('_mcdict_version')))
+    if type(data.get('_author')) is not str:
+        issues.append('Author is missing')
+
+    concepts = data.get('concepts')
+    if type(concepts) is not dict:
+        issues.append('concepts is missing')
+        return issues
+
+    for idf_hex, obj in concepts.items():
+        if type(obj) is not dict or '_surface' not in obj or type(obj.get('identifiers')) is not dict:
+            issues.append('{}: Malformed identifier'.format(idf_hex))
+            continue
+
+        for idf_var, cls in obj['identifiers'].items():
+            if type(cls) is not list:
+                issues.append('{}/{}: Malformed concept list'.format(idf_hex, idf_var))
+                continue
+
+            for i, c in enumerate(cls):
+                if type(c) is not dict or set(c.keys()) != CONCEPT_FIELDS:
+                    issues.append('{}/{}: Malformed concept {}'.format(idf_hex, idf_var, i))
+
+    return issues
+
+
+class SourceIndex:
+    """Lookup tables of a source HTML for the cross-reference checks"""
+
+    def __init__(self, tree, mi2idf: dict) -> None:
+        root = tree.getroot()
+
+        self.mi2idf = mi2idf
+        self.word_pos = {e.get('id'): i for i, e in enumerate(root.xpath('//span[@class="gd_word"]'))}
+
+
+def validate_references(anno: dict, mcdict: dict, index: SourceIndex) -> list[str]:
+    """Check the references among the annotation, the mcdict and the source
+
+    The data must have passed validate_anno and validate_mcdict.
+    """
+    issues = []
+
+    # the number of concepts for each identifier
+    nof_concepts = dict()
+    for idf_hex, obj in mcdict.get('concepts', dict()).items():
+        for idf_var, cls in obj.get('identifiers', dict()).items():
+            nof_concepts[(idf_hex, idf_var)] = len(cls)
+
+    for mi_id, a in anno.get('mi_anno', dict()).items():
+        if mi_id not in index.mi2idf:
+            issues.append('{}: No such mi element in the source'.format(mi_id))
+            continue
+
+        idf = index.mi2idf[mi_id]
+        if idf is None:
+            issues.append('{}: Not an identifier in the source'.format(mi_id))
+            continue
+
+        key = (idf['idf_hex'], idf['idf_var'])
+        if key not in nof_concepts:
+            issues.append('{}: Identifier {}/{} is not in the mcdict'.format(mi_id, *key))
+        elif type(a.get('concept_id')) is int and a['concept_id'] >= nof_concepts[key]:
+            issues.append('{}: concept_id {} is out of range for {}/{}'.format(mi_id, a['concept_id'], *key))
+
+        for sog in a['sog']:
+            start, stop = index.word_pos.get(sog['start']), index.word_pos.get(sog['stop'])
+            if start is None or stop is None:
+                issues.append('{}: SoG {}-{} refers to unknown words'.format(mi_id, sog['start'], sog['stop']))
+            elif start > stop:
+                issues.append('{}: SoG {}-{} is reversed'.format(mi_id, sog['start'], sog['stop']))
+
+    # identifiers not to be annotated (an mi without id cannot be annotated)
+    for mi_id, idf in index.mi2idf.items():
+        if mi_id is not None and idf is not None and mi_id not in anno.get('mi_anno', dict()):
+            issues.append('{}: Identifier in the source is not in the annotation'.format(mi_id))
+
+    return issues
+
+
+VALIDATORS = {
+    'anno': validate_anno,
+    'mcdict': validate_mcdict,
+}
@@ -1,13 +1,22 @@
 # The Flask application
-from flask import Flask
+from flask import Flask, request, g
+import time
+import logging
 import os
 import lxml.html
 from docopt import docopt
 from pathlib import Path
 
 from lib.version import VERSION
-from lib.annotation import MiAnno, McDict
+from lib.util import expand_word_spans
+from lib.store import CorpusStore
+from lib.context import ContextIndex, context_file
+from lib.annotation import MiAnno, McDict, data_files
 from server.miogatto import MioGattoServer
+from server.metrics import Metrics
+from server.diagnostics import Diagnostics
+from server.asgi import AsgiApp
+from server.static_body import build_static_body, is_up_to_date
 
 # meta
 PROG_NAME = "server"
@@ -21,7 +30,23 @@ Options:
         Dir for the gold data [default: ./data]
     -s DIR, --sources=DIR
         Dir for preprocessed HTML [default: ./sources]
-
+    -f FMT, --format=FMT
+        Format of the data files (json or msgpack) [default: json]
+    -S FILE, --store=FILE
+        Read and write the data through the SQLite corpus store
+    -r DIR, --reference=DIR
+        Dir for the reference data to calculate the agreement with
+
+    --lazy-sections     Load sections except for the first one lazily
+    --static-body       Serve the body as a precompressed file and the concepts
+                        separately (overrides --lazy-sections)
+    --metrics           Record timings and expose them via /metrics
+    --metrics-log       Also log a structured line for each request
+    --asgi              Serve on an event loop with uvicorn (the handlers run in
+                        threads and the data is written in the background)
+    --workers=NUM       Number of threads for the handlers with --asgi [default: 4]
+    --diagnostics       Trace the memory and expose the estimates via
+                        /memory.json (only for local clients)
     -D, --debug         Run in the debug mode
     -p, --port=NUM      Port number [default: 4100]
     --host=HOST         Host name [default: localhost]
@@ -87,6 +112,80 @@ def routing_functions(server):
     def edit_mcdict():
         return server.edit_mcdict()
 
+    routing_page_functions(server)
+    routing_api_functions(server)
+
+
+# endpoints for loading the page in parts
+def routing_page_functions(server):
+    @app.route('/section/<path:sec_id>', methods=['GET'])
+    def section(sec_id):
+        return server.section(sec_id)
+
+    @app.route('/body.html', methods=['GET'])
+    def body():
+        return server.body()
+
+    @app.route('/concepts.json', methods=['GET'])
+    def concepts_json():
+        return server.gen_concepts_json()
+
+
+# endpoints for the incremental operations
+def routing_api_functions(server):
+    @app.route('/_batch', methods=['POST'])
+    def action_batch():
+        return server.batch()
+
+    @app.route('/stats.json', methods=['GET'])
+    def stats_json():
+        return server.gen_stats_json()
+
+    @app.route('/occurrences.json', methods=['GET'])
+    def occurrences_json():
+        return server.gen_occurrences_json()
+
+    @app.route('/context.json', methods=['GET'])
+    def context_json():
+        return server.gen_context_json()
+
+    @app.route('/agreement.json', methods=['GET'])
+    def agreement_json():
+        return server.gen_agreement_json()
+
+    @app.route('/unannotated.json', methods=['GET'])
+    def unannotated_json():
+        return server.gen_unannotated_json()
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return server.gen_metrics()
+
+    @app.route('/memory.json', methods=['GET'])
+    def memory_json():
+        return server.gen_memory_json()
+
+
+# per-request instrumentation (only registered if enabled)
+def instrument_requests(metrics):
+    @app.before_request
+    def start_timer():
+        g.start_time = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        duration = time.perf_counter() - g.start_time
+        route = request.url_rule.rule if request.url_rule is not None else 'unknown'
+        size = response.content_length
+
+        metrics.observe('miogatto_request_duration_seconds', duration, route=route, method=request.method)
+        metrics.inc('miogatto_requests_total', route=route, method=request.method, status=response.status_code)
+        if size is not None:
+            metrics.observe('miogatto_response_size_bytes', size, route=route)
+
+        metrics.log_request(route, request.method, response.status_code, duration, size)
+        return response
+
 
 def main():
     # parse options
@@ -94,26 +193,77 @@ def main():
 
     paper_id = args['ID']
 
+    if args['--asgi']:
+        try:
+            import uvicorn
+        except ImportError:
+            app.logger.critical('uvicorn is required for --asgi')
+            exit(1)
+
     # dir and files
     data_dir = Path(args['--data'])
     sources_dir = Path(args['--sources'])
 
-    anno_json = data_dir / '{}_anno.json'.format(paper_id)
-    mcdict_json = data_dir / '{}_mcdict.json'.format(paper_id)
+    anno_json, mcdict_json = data_files(data_dir, paper_id, args['--format'])
     source_html = sources_dir / '{}.html'.format(paper_id)
 
     # load the data
-    mi_anno = MiAnno(anno_json)
-    mcdict = McDict(mcdict_json)
+    if args['--store'] is not None:
+        store = CorpusStore(Path(args['--store']))
+        mi_anno = MiAnno.from_store(store, paper_id)
+        mcdict = McDict.from_store(store, paper_id)
+    else:
+        mi_anno = MiAnno(anno_json)
+        mcdict = McDict(mcdict_json)
     tree = lxml.html.parse(str(source_html))
+    expand_word_spans(tree.getroot())
+
+    # the reference data is loaded only once
+    reference = None
+    if args['--reference'] is not None:
+        ref_anno_json, ref_mcdict_json = data_files(Path(args['--reference']), paper_id, args['--format'])
+        reference = (MiAnno(ref_anno_json), McDict(ref_mcdict_json))
 
     # run the app
     app.debug = args['--debug']
 
-    server = MioGattoServer(paper_id, tree, mi_anno, mcdict, app.logger)
+    metrics = Metrics(args['--metrics'] or args['--metrics-log'], app.logger if args['--metrics-log'] else None)
+    if metrics.enabled:
+        instrument_requests(metrics)
+    if args['--metrics-log']:
+        app.logger.setLevel(logging.INFO)
+
+    # (re)build the static body on the first load
+    static_body = None
+    if args['--static-body']:
+        static_body = (sources_dir / '{}.body.html'.format(paper_id)).absolute()
+        if not is_up_to_date(static_body, source_html):
+            app.logger.info('Building the static body %s', static_body)
+            build_static_body(tree, static_body)
+
+    # the context index is built if not preprocessed
+    context_json = context_file(sources_dir, paper_id)
+    context_index = ContextIndex.load(context_json) if context_json.exists() else None
+
+    server = MioGattoServer(
+        paper_id,
+        tree,
+        mi_anno,
+        mcdict,
+        app.logger,
+        args['--lazy-sections'],
+        metrics,
+        static_body,
+        context_index,
+        reference,
+        Diagnostics(args['--diagnostics']),
+    )
     routing_functions(server)
 
-    app.run(host=args['--host'], port=args['--port'])
+    if args['--asgi']:
+        uvicorn.run(AsgiApp(app, server, int(args['--workers'])), host=args['--host'], port=int(args['--port']))
+    else:
+        app.run(host=args['--host'], port=args['--port'])
 
 
 if __name__ == '__main__':
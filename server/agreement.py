@@ -0,0 +1,108 @@
+# Live agreement with a reference annotation for the MioGatto server
+import math
+from collections import Counter, defaultdict
+from typing import Optional
+
+from lib.annotation import MiAnno, McDict
+
+
+def kappa_from_confusion(confusion: Counter) -> float:
+    """Cohen's kappa from the counts of (reference, target) label pairs"""
+    n = sum(confusion.values())
+    if n == 0:
+        return math.nan
+
+    ref_cnt, target_cnt = Counter(), Counter()
+    for (r, t), c in confusion.items():
+        ref_cnt[r] += c
+        target_cnt[t] += c
+
+    p_o = sum(c for (r, t), c in confusion.items() if r == t) / n
+    p_e = sum(ref_cnt[k] * target_cnt[k] for k in ref_cnt) / (n * n)
+
+    # the same as sklearn (nan if the chance agreement is perfect)
+    return (p_o - p_e) / (1 - p_e) if p_e != 1 else math.nan
+
+
+class AgreementTracker:
+    """Agreement counts with the reference updated on each concept change
+
+    The numbers are the same as calc_agreements of tools.agreement.
+    """
+
+    def __init__(self, ref_mi_anno: MiAnno, ref_mcdict: McDict, mi_anno: MiAnno, mi2idf: dict) -> None:
+        self.ref_mi_anno = ref_mi_anno
+        self.ref_mcdict = ref_mcdict
+        self.mi2idf = mi2idf
+
+        self.pos, self.neg, self.pt_miss, self.unannotated = 0, 0, 0, 0
+        self.confusion: defaultdict = defaultdict(Counter)
+
+        for mi_id, anno in mi_anno.occr.items():
+            self.count(mi_id, anno['concept_id'], 1)
+
+    def pattern_agreed(self, idf_key: tuple, concept_id_gold: Optional[int], concept_id_target: int) -> bool:
+        concept_list = self.ref_mcdict.concepts.get(idf_key[0], dict()).get(idf_key[1], [])
+        if concept_id_gold is None or max(concept_id_gold, concept_id_target) >= len(concept_list):
+            return False
+
+        return concept_list[concept_id_gold].affixes == concept_list[concept_id_target].affixes
+
+    def count(self, mi_id: str, concept_id_target: Optional[int], diff: int) -> None:
+        ref_anno = self.ref_mi_anno.occr.get(mi_id)
+        idf = self.mi2idf.get(mi_id)
+        if ref_anno is None or idf is None:
+            return
+
+        if concept_id_target is None:
+            self.unannotated += diff
+            return
+
+        concept_id_gold = ref_anno['concept_id']
+        idf_key = (idf['idf_hex'], idf['idf_var'])
+        self.confusion[idf_key][(concept_id_gold, concept_id_target)] += diff
+
+        if concept_id_target == concept_id_gold:
+            self.pos += diff
+        else:
+            self.neg += diff
+            if not self.pattern_agreed(idf_key, concept_id_gold, concept_id_target):
+                self.pt_miss += diff
+
+    def change_concept(self, mi_id: str, old_concept_id: Optional[int], new_concept_id: Optional[int]) -> None:
+        self.count(mi_id, old_concept_id, -1)
+        self.count(mi_id, new_concept_id, 1)
+
+    def to_dict(self) -> dict:
+        kappas = []
+        w_sum, w_cnt = 0.0, 0
+
+        for (idf_hex, idf_var), confusion in self.confusion.items():
+            count = sum(confusion.values())
+            if count == 0:
+                continue
+
+            kappa = kappa_from_confusion(confusion)
+            if not math.isnan(kappa):
+                w_sum += kappa * count
+                w_cnt += count
+
+            kappas.append(
+                {
+                    'idf_hex': idf_hex,
+                    'idf_var': idf_var,
+                    'kappa': None if math.isnan(kappa) else kappa,
+                    'count': count,
+                    'confusion': [[r, t, c] for (r, t), c in sorted(confusion.items(), key=str) if c > 0],
+                }
+            )
+
+        total = self.pos + self.neg
+        return {
+            'reference': {'annotator': self.ref_mi_anno.annotator, 'author': self.ref_mcdict.author},
+            'agreement': {'pos': self.pos, 'total': total, 'rate': self.pos / total if total > 0 else None},
+            'pattern_mismatches': {'count': self.pt_miss, 'neg': self.neg},
+            'unannotated': self.unannotated,
+            'kappas': sorted(kappas, key=lambda k: k['count'], reverse=True),
+            'weighted_kappa': w_sum / w_cnt if w_cnt > 0 else None,
+        }
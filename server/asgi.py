@@ -0,0 +1,222 @@
+# ASGI application for the MioGatto server
+import io
+import os
+import sys
+import json
+import asyncio
+import threading
+from logging import Logger
+from pathlib import Path
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.annotation import get_storage
+
+# interval of the comments keeping the event streams alive (seconds)
+KEEPALIVE_INTERVAL = 15.0
+
+
+class AsyncWriter:
+    """Write the data files in a background thread
+
+    The data is serialized by the caller under the lock, so the written file
+    is a consistent snapshot and a newer snapshot is never overwritten by an
+    older one. Writes of the same file are coalesced (the latest data wins).
+    """
+
+    def __init__(self, logger: Logger) -> None:
+        self.logger = logger
+        self.executor = ThreadPoolExecutor(1)
+        self.lock = threading.Lock()
+        self.pending: dict[Path, bytes] = dict()
+
+    def save(self, obj) -> None:
+        with self.lock:
+            # a save of the store is a transaction on the connection shared by
+            # the threads, so it is done in place (but never concurrently)
+            if obj.store is not None:
+                obj.dump()
+                return
+
+            scheduled = obj.file in self.pending
+            self.pending[obj.file] = get_storage(obj.file).dumps(obj.to_dict())
+
+        if not scheduled:
+            self.executor.submit(self.write, obj.file).add_done_callback(self.check_error)
+
+    def write(self, file: Path) -> None:
+        with self.lock:
+            data = self.pending.pop(file)
+
+        # never leave a truncated file
+        tmp_file = file.with_name('.{}.tmp'.format(file.name))
+        tmp_file.write_bytes(data)
+        os.replace(tmp_file, file)
+
+    def check_error(self, future) -> None:
+        if future.exception() is not None:
+            self.logger.error('Failed to write the data: %s', future.exception())
+
+    def close(self) -> None:
+        """Wait for the pending writes"""
+        self.executor.shutdown(wait=True)
+
+
+class Notifier:
+    """Broadcast the changes of the data to the event streams"""
+
+    def __init__(self) -> None:
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queues: set[asyncio.Queue] = set()
+
+    def notify(self, event: dict) -> None:
+        # called from the worker threads
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.broadcast, event)
+
+    def broadcast(self, event: dict) -> None:
+        for queue in self.queues:
+            queue.put_nowait(event)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self.queues.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.queues.discard(queue)
+
+
+def wsgi_environ(scope: dict, body: bytes) -> dict:
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+    for name, value in scope['headers']:
+        name, value = name.decode('latin-1').upper().replace('-', '_'), value.decode('latin-1')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else 'HTTP_' + name
+        environ[key] = environ[key] + ',' + value if key in environ else value
+
+    # the body is already read as a whole (even if chunked)
+    environ['CONTENT_LENGTH'] = str(len(body))
+
+    return environ
+
+
+def call_wsgi(wsgi_app, environ: dict) -> tuple[int, list, bytes]:
+    response: list = []
+
+    def start_response(status, headers, exc_info=None):
+        response[:] = [int(status.split(' ', 1)[0]), headers]
+
+    result = wsgi_app(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+    return response[0], [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response[1]], body
+
+
+class AsgiApp:
+    """Serve the Flask app on an event loop
+
+    The handlers (including rendering) run in a thread pool, the data files
+    are written in the background, and the changes are pushed to the clients
+    of /events as server-sent events.
+    """
+
+    def __init__(self, wsgi_app, server, workers: int = 4) -> None:
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(workers)
+        self.writer = AsyncWriter(server.logger)
+        self.notifier = Notifier()
+
+        server.writer, server.notifier = self.writer, self.notifier
+        self.server = server
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self.notifier.loop is None:
+            self.notifier.loop = asyncio.get_running_loop()
+
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['path'] == '/events':
+            await self.events(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, self.writer.close)
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send) -> None:
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body', False):
+                break
+
+        loop = asyncio.get_running_loop()
+        status, headers, content = await loop.run_in_executor(
+            self.executor, call_wsgi, self.wsgi_app, wsgi_environ(scope, body)
+        )
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def events(self, receive, send) -> None:
+        async def wait_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        queue = self.notifier.subscribe()
+        disconnected = asyncio.ensure_future(wait_disconnect())
+        headers = [(b'content-type', b'text/event-stream'), (b'cache-control', b'no-cache')]
+
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+            event = {'kind': 'hello', 'mcdict_edit_id': str(self.server.mcdict_edit_id)}
+
+            while not disconnected.done():
+                if event is not None:
+                    message = 'event: {}\ndata: {}\n\n'.format(event['kind'], json.dumps(event, ensure_ascii=False))
+                else:
+                    message = ': keep-alive\n\n'
+                await send({'type': 'http.response.body', 'body': message.encode(), 'more_body': True})
+
+                # wait for the next change (or the client leaving)
+                get = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {get, disconnected}, timeout=KEEPALIVE_INTERVAL, return_when=asyncio.FIRST_COMPLETED
+                )
+                event = get.result() if get in done else None
+                get.cancel()
+
+        finally:
+            self.notifier.unsubscribe(queue)
+            disconnected.cancel()
@@ -0,0 +1,64 @@
+# Reverse index from concepts to occurrences for the MioGatto server
+from collections import defaultdict
+from typing import Optional
+
+from lib.annotation import MiAnno
+
+
+class ConceptIndex:
+    """Occurrences (mi_ids) of each identifier and concept
+
+    Keys are (idf_hex, idf_var) for identifiers and (idf_hex, idf_var,
+    concept_id) for concepts. The mi_ids are returned in document order.
+    """
+
+    def __init__(self, mi_anno: MiAnno, mi2idf: dict) -> None:
+        self.mi2idf = mi2idf
+        self.order = {mi_id: i for i, mi_id in enumerate(mi2idf.keys())}
+
+        self.idf_occr: defaultdict = defaultdict(set)
+        self.concept_occr: defaultdict = defaultdict(set)
+
+        for mi_id, anno in mi_anno.occr.items():
+            idf = self.get_idf(mi_id)
+            if idf is None:
+                continue
+
+            self.idf_occr[idf].add(mi_id)
+            if anno['concept_id'] is not None:
+                self.concept_occr[(*idf, anno['concept_id'])].add(mi_id)
+
+    def get_idf(self, mi_id: str) -> Optional[tuple[str, str]]:
+        idf = self.mi2idf.get(mi_id)
+        if idf is None:
+            return None
+
+        return idf['idf_hex'], idf['idf_var']
+
+    def change_concept(self, mi_id: str, old_id: Optional[int], new_id: Optional[int]) -> None:
+        idf = self.get_idf(mi_id)
+        if idf is None:
+            return
+
+        if old_id is not None:
+            self.concept_occr[(*idf, old_id)].discard(mi_id)
+        if new_id is not None:
+            self.concept_occr[(*idf, new_id)].add(mi_id)
+
+    def sort(self, mi_ids) -> list[str]:
+        return sorted(mi_ids, key=lambda mi_id: self.order.get(mi_id, -1))
+
+    def occurrences(self, idf_hex: str, idf_var: str, concept_id: Optional[int] = None) -> list[str]:
+        if concept_id is None:
+            mi_ids = self.idf_occr.get((idf_hex, idf_var), set())
+        else:
+            mi_ids = self.concept_occr.get((idf_hex, idf_var, concept_id), set())
+
+        return self.sort(mi_ids)
+
+    def unannotated(self, idf_hex: str, idf_var: str, nof_concepts: int) -> list[str]:
+        mi_ids = set(self.idf_occr.get((idf_hex, idf_var), set()))
+        for concept_id in range(nof_concepts):
+            mi_ids -= self.concept_occr.get((idf_hex, idf_var, concept_id), set())
+
+        return self.sort(mi_ids)
@@ -0,0 +1,75 @@
+# Memory diagnostics for the MioGatto server
+import gc
+
+from lib.memory import AllocationTracer, deep_sizeof, peak_rss
+
+# the diagnostics reveal the internals, so only local clients are allowed
+LOCAL_ADDRS = ('127.0.0.1', '::1')
+
+
+class Diagnostics:
+    """Memory estimates of the paper and the allocation diffs with tracemalloc
+
+    Tracing slows down the server, so nothing is traced if disabled.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.tracer = AllocationTracer() if enabled else None
+
+        if self.tracer is not None:
+            self.tracer.start()
+
+    @staticmethod
+    def paper(server) -> dict:
+        tree_nodes = sum(1 for _ in server.tree.iter())
+        shell_nodes = sum(1 for _ in server.shell_tree.iter()) if server.shell_tree is not None else None
+
+        concepts = server.mcdict.concepts
+        caches = {
+            'mi2idf': server.mi2idf,
+            'stats': server.stats,
+            'concept_index': server.concept_index,
+            'unannotated_index': server.unannotated_index,
+            'context_index': server.context_index,
+            'words': server.words,
+            'agreement': server.agreement,
+        }
+
+        # shared objects are counted once in the first of them, so the sizes add up
+        seen: set = set()
+        sizes = {
+            'mi_anno': deep_sizeof(server.mi_anno.occr, seen),
+            'mcdict': deep_sizeof(concepts, seen),
+            'caches': {name: deep_sizeof(obj, seen) if obj is not None else None for name, obj in caches.items()},
+        }
+        sizes['total'] = sizes['mi_anno'] + sizes['mcdict'] + sum(n for n in sizes['caches'].values() if n is not None)
+
+        return {
+            'tree': {
+                'nodes': tree_nodes,
+                'shell_nodes': shell_nodes,
+                'sections': len(server.sections),
+                'static_body_size': server.static_body.stat().st_size if server.static_body is not None else None,
+            },
+            'objects': {
+                'occurrences': len(server.mi_anno.occr),
+                'sogs': server.stats.nof_sog,
+                'identifiers': sum(len(idf) for idf in concepts.values()),
+                'concepts': sum(len(cls) for idf in concepts.values() for cls in idf.values()),
+                'words': len(server.words),
+            },
+            'sizes': sizes,
+        }
+
+    def to_dict(self, server, top: int, reset: bool) -> dict:
+        """The estimates and the top allocations since the start (or the last reset)"""
+        return {
+            'paper': self.paper(server),
+            'process': {
+                'peak_rss': peak_rss(),
+                'traced': self.tracer.usage(),
+                'gc': {'objects': len(gc.get_objects()), 'counts': gc.get_count(), 'garbage': len(gc.garbage)},
+            },
+            'allocations': self.tracer.top_diff(top, reset),
+        }
@@ -0,0 +1,113 @@
+# Instrumentation for the MioGatto server
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from logging import Logger
+from typing import Optional
+
+# upper bounds of the histogram buckets
+TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+HISTOGRAMS = {
+    'miogatto_request_duration_seconds': ('Request latency by route', TIME_BUCKETS),
+    'miogatto_phase_duration_seconds': ('Time spent in each phase of the handlers', TIME_BUCKETS),
+    'miogatto_response_size_bytes': ('Response payload size by route', SIZE_BUCKETS),
+}
+
+COUNTERS = {
+    'miogatto_requests_total': 'Number of requests by route and status',
+    'miogatto_stale_edit_rejections_total': 'Number of actions rejected for an outdated concept list',
+}
+
+_null_timer = nullcontext()
+
+
+def format_labels(labels: tuple) -> str:
+    return ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in labels)
+
+
+class Metrics:
+    """Latency histograms and counters in the Prometheus text format
+
+    Everything is a no-op if the metrics are disabled.
+    """
+
+    def __init__(self, enabled: bool = False, logger: Optional[Logger] = None) -> None:
+        self.enabled = enabled
+        self.logger = logger
+
+        # (name, labels) -> [bucket counts, sum, count] or count
+        self.histograms: dict = dict()
+        self.counters: dict = dict()
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+
+        key = (name, tuple(sorted(labels.items())))
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = [[0] * len(HISTOGRAMS[name][1]), 0.0, 0]
+
+        for i, bound in enumerate(HISTOGRAMS[name][1]):
+            if value <= bound:
+                hist[0][i] += 1
+        hist[1] += value
+        hist[2] += 1
+
+    def inc(self, name: str, **labels) -> None:
+        if not self.enabled:
+            return
+
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + 1
+
+    def timer(self, phase: str):
+        if not self.enabled:
+            return _null_timer
+
+        return self.__timer(phase)
+
+    @contextmanager
+    def __timer(self, phase: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('miogatto_phase_duration_seconds', time.perf_counter() - t0, phase=phase)
+
+    def log_request(self, route: str, method: str, status: int, duration: float, size: Optional[int]) -> None:
+        if self.logger is None:
+            return
+
+        record = {'route': route, 'method': method, 'status': status, 'duration': round(duration, 6), 'size': size}
+        self.logger.info(json.dumps(record))
+
+    def render(self) -> str:
+        lines = []
+
+        for name, (doc, buckets) in HISTOGRAMS.items():
+            lines.append('# HELP {} {}'.format(name, doc))
+            lines.append('# TYPE {} histogram'.format(name))
+
+            for (n, labels), (counts, total, count) in sorted(self.histograms.items()):
+                if n != name:
+                    continue
+
+                for bound, c in zip(buckets, counts):
+                    le = format_labels(labels + (('le', repr(bound)),))
+                    lines.append('{}_bucket{{{}}} {}'.format(name, le, c))
+                lines.append('{}_bucket{{{}}} {}'.format(name, format_labels(labels + (('le', '+Inf'),)), count))
+                lines.append('{}_sum{{{}}} {}'.format(name, format_labels(labels), total))
+                lines.append('{}_count{{{}}} {}'.format(name, format_labels(labels), count))
+
+        for name, doc in COUNTERS.items():
+            lines.append('# HELP {} {}'.format(name, doc))
+            lines.append('# TYPE {} counter'.format(name))
+
+            for (n, labels), count in sorted(self.counters.items()):
+                if n == name:
+                    lines.append('{}{{{}}} {}'.format(name, format_labels(labels), count))
+
+        return '\n'.join(lines) + '\n'
@@ -1,16 +1,28 @@
 # The server implementation for MioGatto
-from flask import request, redirect, flash, render_template, Markup
+from flask import request, redirect, flash, render_template, abort, send_file, Markup
 from typing import Optional
 from logging import Logger
 from copy import deepcopy
+from pathlib import Path
 from lxml import etree
 import subprocess
 import json
 import re
 
 from lib.version import VERSION
+from lib.util import get_mi2idf
 from lib.annotation import MiAnno, McDict
+from lib.context import ContextIndex
 from lib.datatypes import MathConcept
+from lib.validation import SOG_TYPES
+from server.stats import AnnotationStats
+from server.concept_index import ConceptIndex
+from server.navigation import UnannotatedIndex
+from server.agreement import AgreementTracker
+from server.metrics import Metrics
+from server.diagnostics import Diagnostics, LOCAL_ADDRS
+from server.static_body import gzip_file
+from server.asgi import AsyncWriter, Notifier
 
 # get git revision
 try:
@@ -43,6 +55,14 @@ def make_concept(res) -> Optional[MathConcept]:
     return MathConcept(description, arity, affixes)
 
 
+def find_sog(mi_id: str, anno: dict, action: dict) -> dict:
+    for sog in anno['sog']:
+        if sog['start'] == action.get('start_id') and sog['stop'] == action.get('stop_id'):
+            return sog
+
+    raise ValueError('No such SoG for {}'.format(mi_id))
+
+
 def affixes_pulldowns():
     select_tag = '''<li><select name="affixes{}">
 <option value="">-----</option>
@@ -135,23 +155,71 @@ def preprocess_mcdict(concepts):
 
 
 class MioGattoServer:
-    def __init__(self, paper_id: str, tree, mi_anno: MiAnno, mcdict: McDict, logger: Logger):
+    def __init__(
+        self,
+        paper_id: str,
+        tree,
+        mi_anno: MiAnno,
+        mcdict: McDict,
+        logger: Logger,
+        lazy_sections: bool = False,
+        metrics: Optional[Metrics] = None,
+        static_body: Optional[Path] = None,
+        context_index: Optional[ContextIndex] = None,
+        reference: Optional[tuple[MiAnno, McDict]] = None,
+        diagnostics: Optional[Diagnostics] = None,
+    ):
         self.paper_id = paper_id
         self.tree = tree
         self.mi_anno = mi_anno
         self.mcdict = mcdict
         self.logger = logger
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.diagnostics = diagnostics if diagnostics is not None else Diagnostics()
+
+        # progress counters (updated on each mutation)
+        self.mi2idf = get_mi2idf(tree)
+        self.stats = AnnotationStats(mi_anno, self.mi2idf)
+        self.concept_index = ConceptIndex(mi_anno, self.mi2idf)
+        self.unannotated_index = UnannotatedIndex(mi_anno, self.mi2idf)
+        self.agreement = AgreementTracker(*reference, mi_anno, self.mi2idf) if reference is not None else None
+
+        # words around the occurrences
+        self.context_index = context_index if context_index is not None else ContextIndex.build(tree)
+        self.words = [(e.get('id'), e.text or '') for e in tree.xpath('//span[@class="gd_word"]')]
+
+        # top-level sections except for the first one are loaded lazily
+        self.sections = {e.get('id'): e for e in tree.xpath('//section[@id][not(ancestor::section)]')}
+        self.shell_tree = self.make_shell_tree(tree) if lazy_sections and static_body is None else None
+
+        # the body is served as a (precompressed) file with the concepts in a separate map
+        self.static_body = static_body
 
         # Start with 0 (can be considered as the number of times the mcdict is edited)
         self.mcdict_edit_id = 0
 
-    def index(self):
-        # avoid destroying the original tree
-        copied_tree = deepcopy(self.tree)
-        root = copied_tree.getroot()
+        # the mcdict_edit_id at the last edit of each concept list (0 if never edited)
+        self.idf_versions: dict[tuple[str, str], int] = dict()
+
+        # background persistence and change notifications (set by the ASGI app)
+        self.writer: Optional[AsyncWriter] = None
+        self.notifier: Optional[Notifier] = None
+
+    def make_shell_tree(self, tree):
+        shell_tree = deepcopy(tree)
 
+        # replace the sections with empty placeholders
+        for sec in shell_tree.xpath('//section[@id][not(ancestor::section)]')[1:]:
+            for c in list(sec):
+                sec.remove(c)
+            sec.text = None
+            sec.attrib['data-lazy-section'] = 'true'
+
+        return shell_tree
+
+    def stamp_concepts(self, root):
         # add data-math-concept for each mi element
-        for mi in root.xpath('//mi'):
+        for mi in root.iter('mi'):
             mi_id = mi.get('id', None)
             if mi_id is None:
                 continue
@@ -162,40 +230,71 @@ class MioGattoServer:
 
             mi.attrib['data-math-concept'] = str(concept_id)
 
-        # progress info
-        nof_anno = len(self.mi_anno.occr)
-        nof_done = sum(1 for v in self.mi_anno.occr.values() if not v['concept_id'] is None)
-        p_concept = '{}/{} ({:.2f}%)'.format(nof_done, nof_anno, nof_done / nof_anno * 100)
+    def index(self):
+        title = self.tree.getroot().xpath('//head/title')[0].text
 
-        nof_sog = 0
-        for anno in self.mi_anno.occr.values():
-            for sog in anno['sog']:
-                nof_sog += 1
+        if self.static_body is not None:
+            # the client loads the body and the concepts
+            main_content = '<div id="static-body"></div>'
 
-        # construction
-        title = root.xpath('//head/title')[0].text
-        body = root.xpath('body')[0]
-        main_content = etree.tostring(body, method='html', encoding=str)
+        else:
+            # avoid destroying the original tree (or the shell for lazy loading)
+            with self.metrics.timer('tree_copy'):
+                copied_tree = deepcopy(self.tree if self.shell_tree is None else self.shell_tree)
+                root = copied_tree.getroot()
+                self.stamp_concepts(root)
+
+            # construction
+            body = root.xpath('body')[0]
+            with self.metrics.timer('serialization'):
+                main_content = etree.tostring(body, method='html', encoding=str)
 
-        return render_template(
+        return self.render_template(
             'index.html',
             title=title,
             version=VERSION,
             git_revision=GIT_REVISON,
             paper_id=self.paper_id,
             annotator=self.mi_anno.annotator,
-            p_concept=p_concept,
-            nof_sog=nof_sog,
+            p_concept=self.stats.p_concept(),
+            nof_sog=self.stats.nof_sog,
             affixes=Markup(affixes_pulldowns()),
             main_content=Markup(main_content),
+            lazy_sections=self.shell_tree is not None,
+            static_body=self.static_body is not None,
         )
 
+    def section(self, sec_id: str):
+        sec = self.sections.get(sec_id)
+        if sec is None:
+            abort(404)
+
+        with self.metrics.timer('tree_copy'):
+            copied_sec = deepcopy(sec)
+            self.stamp_concepts(copied_sec)
+
+        with self.metrics.timer('serialization'):
+            return etree.tostring(copied_sec, method='html', encoding=str, with_tail=False)
+
+    def body(self):
+        if self.static_body is None:
+            abort(404)
+
+        # the files are sent without copying them in Python if possible
+        if 'gzip' in request.accept_encodings:
+            response = send_file(gzip_file(self.static_body), mimetype='text/html', conditional=True)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = send_file(self.static_body, mimetype='text/html', conditional=True)
+
+        response.vary.add('Accept-Encoding')
+        return response
+
     def assign_concept(self):
         res = request.form
 
-        # If the mcdict used in the request differs from the latest, then redirect (i.e., reload the page).
-        edit_id_in_request = res.get('mcdict_edit_id')
-        if edit_id_in_request is None or str(self.mcdict_edit_id) != edit_id_in_request:
+        # If the concept lists used in the request have been modified, then redirect (i.e., reload the page).
+        if not self.check_mcdict_edit_id(res, self.idf_keys([res.get('mi_id')])):
             flash('Invalid Action!!! Reloading the page since the mcdict has been modified.')
             return redirect('/')
 
@@ -204,32 +303,30 @@ class MioGattoServer:
 
         if res.get('concept'):
             # register
-            self.mi_anno.occr[mi_id]['concept_id'] = concept_id
-            self.mi_anno.dump()
+            self.set_concept(mi_id, concept_id)
+            self.dump_mi_anno()
 
         return redirect('/')
 
     def remove_concept(self):
         res = request.form
 
-        # If the mcdict used in the request differs from the latest, then redirect (i.e., reload the page).
-        edit_id_in_request = res.get('mcdict_edit_id')
-        if edit_id_in_request is None or str(self.mcdict_edit_id) != edit_id_in_request:
+        # If the concept lists used in the request have been modified, then redirect (i.e., reload the page).
+        if not self.check_mcdict_edit_id(res, self.idf_keys([res.get('mi_id')])):
             flash('Invalid Action!!! Reloading the page since the mcdict has been modified.')
             return redirect('/')
 
         mi_id = res['mi_id']
-        self.mi_anno.occr[mi_id]['concept_id'] = None
-        self.mi_anno.dump()
+        self.set_concept(mi_id, None)
+        self.dump_mi_anno()
 
         return redirect('/')
 
     def new_concept(self):
         res = request.form
 
-        # If the mcdict used in the request differs from the latest, then redirect (i.e., reload the page).
-        edit_id_in_request = res.get('mcdict_edit_id')
-        if edit_id_in_request is None or str(self.mcdict_edit_id) != edit_id_in_request:
+        # If the concept lists used in the request have been modified, then redirect (i.e., reload the page).
+        if not self.check_mcdict_edit_id(res, [(res.get('idf_hex'), res.get('idf_var'))]):
             flash('Invalid Action!!! Reloading the page since the mcdict has been modified.')
             return redirect('/')
 
@@ -243,9 +340,9 @@ class MioGattoServer:
 
         # register
         self.mcdict.concepts[idf_hex][idf_var].append(concept)
-        self.mcdict.dump()
+        self.dump_mcdict()
 
-        self.update_mcdict_edit_id()
+        self.update_mcdict_edit_id(idf_hex, idf_var)
 
         return redirect('/')
 
@@ -253,9 +350,8 @@ class MioGattoServer:
         # register and save data_anno
         res = request.form
 
-        # If the mcdict used in the request differs from the latest, then redirect (i.e., reload the page).
-        edit_id_in_request = res.get('mcdict_edit_id')
-        if edit_id_in_request is None or str(self.mcdict_edit_id) != edit_id_in_request:
+        # If the concept lists used in the request have been modified, then redirect (i.e., reload the page).
+        if not self.check_mcdict_edit_id(res, [(res.get('idf_hex'), res.get('idf_var'))]):
             flash('Invalid Action!!! Reloading the page since the mcdict has been modified.')
             return redirect('/')
 
@@ -269,9 +365,9 @@ class MioGattoServer:
             return redirect('/')
 
         self.mcdict.concepts[idf_hex][idf_var][concept_id] = concept
-        self.mcdict.dump()
+        self.dump_mcdict()
 
-        self.update_mcdict_edit_id()
+        self.update_mcdict_edit_id(idf_hex, idf_var)
 
         return redirect('/')
 
@@ -280,9 +376,8 @@ class MioGattoServer:
         # register and save data_anno
         res = request.form
 
-        # If the mcdict used in the request differs from the latest, then redirect (i.e., reload the page).
-        edit_id_in_request = res.get('mcdict_edit_id')
-        if edit_id_in_request is None or str(self.mcdict_edit_id) != edit_id_in_request:
+        # If the concept lists used in the request have been modified, then redirect (i.e., reload the page).
+        if not self.check_mcdict_edit_id(res, [(res.get('idf_hex'), res.get('idf_var'))]):
             flash('Invalid Action!!! Reloading the page since the mcdict has been modified.')
             return redirect('/edit_mcdict')
 
@@ -296,18 +391,17 @@ class MioGattoServer:
             return redirect('/edit_mcdict')
 
         self.mcdict.concepts[idf_hex][idf_var][concept_id] = concept
-        self.mcdict.dump()
+        self.dump_mcdict()
 
-        self.update_mcdict_edit_id()
+        self.update_mcdict_edit_id(idf_hex, idf_var)
 
         return redirect('/edit_mcdict')
 
     def add_sog(self):
         res = request.form
 
-        # If the mcdict used in the request differs from the latest, then redirect (i.e., reload the page).
-        edit_id_in_request = res.get('mcdict_edit_id')
-        if edit_id_in_request is None or str(self.mcdict_edit_id) != edit_id_in_request:
+        # If the concept lists used in the request have been modified, then redirect (i.e., reload the page).
+        if not self.check_mcdict_edit_id(res, self.idf_keys([res.get('mi_id')])):
             flash('Invalid Action!!! Reloading the page since the mcdict has been modified.')
             return redirect('/')
 
@@ -318,16 +412,16 @@ class MioGattoServer:
         existing_sog_pos = [(s['start'], s['stop']) for s in self.mi_anno.occr[mi_id]['sog']]
         if (start_id, stop_id) not in existing_sog_pos:
             self.mi_anno.occr[mi_id]['sog'].append({'start': start_id, 'stop': stop_id, 'type': 0})
-            self.mi_anno.dump()
+            self.stats.change_sog(mi_id, self.mi_anno.occr[mi_id]['concept_id'], 1)
+            self.dump_mi_anno()
 
         return redirect('/')
 
     def delete_sog(self):
         res = request.form
 
-        # If the mcdict used in the request differs from the latest, then redirect (i.e., reload the page).
-        edit_id_in_request = res.get('mcdict_edit_id')
-        if edit_id_in_request is None or str(self.mcdict_edit_id) != edit_id_in_request:
+        # If the concept lists used in the request have been modified, then redirect (i.e., reload the page).
+        if not self.check_mcdict_edit_id(res, self.idf_keys([res.get('mi_id')])):
             flash('Invalid Action!!! Reloading the page since the mcdict has been modified.')
             return redirect('/')
 
@@ -342,16 +436,16 @@ class MioGattoServer:
 
         if delete_idx is not None:
             del self.mi_anno.occr[mi_id]['sog'][delete_idx]
-            self.mi_anno.dump()
+            self.stats.change_sog(mi_id, self.mi_anno.occr[mi_id]['concept_id'], -1)
+            self.dump_mi_anno()
 
         return redirect('/')
 
     def change_sog_type(self):
         res = request.form
 
-        # If the mcdict used in the request differs from the latest, then redirect (i.e., reload the page).
-        edit_id_in_request = res.get('mcdict_edit_id')
-        if edit_id_in_request is None or str(self.mcdict_edit_id) != edit_id_in_request:
+        # If the concept lists used in the request have been modified, then redirect (i.e., reload the page).
+        if not self.check_mcdict_edit_id(res, self.idf_keys([res.get('mi_id')])):
             flash('Invalid Action!!! Reloading the page since the mcdict has been modified.')
             return redirect('/')
 
@@ -362,15 +456,95 @@ class MioGattoServer:
         for sog in self.mi_anno.occr[mi_id]['sog']:
             if sog['start'] == start_id and sog['stop'] == stop_id:
                 sog['type'] = sog_type
-                self.mi_anno.dump()
+                self.dump_mi_anno()
                 break
 
         return redirect('/')
 
+    def batch(self):
+        res = request.get_json(silent=True)
+        if type(res) is not dict or type(res.get('actions')) is not list:
+            abort(400)
+
+        # If the concept lists used in the request have been modified, then reject the whole batch.
+        mi_ids = [a['mi_id'] for a in res['actions'] if type(a) is dict and type(a.get('mi_id')) is str]
+        if not self.check_mcdict_edit_id(res, self.idf_keys(mi_ids)):
+            data = {'ok': False, 'error': 'The mcdict has been modified.', 'mcdict_edit_id': str(self.mcdict_edit_id)}
+            return json.dumps(data, ensure_ascii=False), 409
+
+        # apply the actions to copies first so that nothing changes on errors
+        staged, errors = dict(), []
+        for idx, action in enumerate(res['actions']):
+            try:
+                self.stage_action(action, staged)
+            except ValueError as e:
+                errors.append({'index': idx, 'error': str(e)})
+
+        if len(errors) > 0:
+            data = {'ok': False, 'errors': errors}
+            return json.dumps(data, ensure_ascii=False), 400
+
+        for mi_id, anno in staged.items():
+            self.replace_anno(mi_id, anno)
+
+        if len(staged) > 0:
+            self.dump_mi_anno()
+
+        data = {'ok': True, 'applied': len(res['actions'])}
+        return json.dumps(data, ensure_ascii=False)
+
+    def stage_action(self, action, staged: dict):
+        if type(action) is not dict:
+            raise ValueError('Action must be an object.')
+
+        mi_id = action.get('mi_id')
+        if type(mi_id) is not str or mi_id not in self.mi_anno.occr:
+            raise ValueError('Unknown mi_id: {}'.format(mi_id))
+
+        if mi_id not in staged:
+            staged[mi_id] = deepcopy(self.mi_anno.occr[mi_id])
+        anno = staged[mi_id]
+
+        kind = action.get('action')
+        if kind == 'assign':
+            concept_id = action.get('concept')
+            idf = self.mi2idf.get(mi_id) or dict()
+            cls = self.mcdict.concepts.get(idf.get('idf_hex'), dict()).get(idf.get('idf_var'), [])
+            if type(concept_id) is not int or not 0 <= concept_id < len(cls):
+                raise ValueError('Invalid concept for {}: {}'.format(mi_id, concept_id))
+            anno['concept_id'] = concept_id
+
+        elif kind == 'remove':
+            anno['concept_id'] = None
+
+        elif kind == 'add_sog':
+            start_id, stop_id = action.get('start_id'), action.get('stop_id')
+            if type(start_id) is not str or type(stop_id) is not str:
+                raise ValueError('start_id and stop_id are required.')
+            if (start_id, stop_id) not in [(s['start'], s['stop']) for s in anno['sog']]:
+                anno['sog'].append({'start': start_id, 'stop': stop_id, 'type': 0})
+
+        elif kind == 'delete_sog':
+            anno['sog'].remove(find_sog(mi_id, anno, action))
+
+        elif kind == 'change_sog_type':
+            sog_type = action.get('sog_type')
+            if type(sog_type) not in (int, str) or str(sog_type) not in SOG_TYPES:
+                raise ValueError('Invalid sog_type for {}: {}'.format(mi_id, sog_type))
+            find_sog(mi_id, anno, action)['type'] = sog_type
+
+        else:
+            raise ValueError('Unknown action: {}'.format(kind))
+
     def gen_mcdict_json(self):
         data = preprocess_mcdict(self.mcdict.concepts)
 
-        extended_data = [str(self.mcdict_edit_id), data]
+        # the client only reads the first two
+        versions = {
+            idf_hex: {idf_var: self.idf_versions.get((idf_hex, idf_var), 0) for idf_var in idf}
+            for idf_hex, idf in self.mcdict.concepts.items()
+        }
+        extended_data = [str(self.mcdict_edit_id), data, versions]
 
         return json.dumps(extended_data, ensure_ascii=False, indent=4, sort_keys=True, separators=(',', ': '))
 
@@ -385,30 +559,93 @@ class MioGattoServer:
 
         return json.dumps(data, ensure_ascii=False, indent=4, sort_keys=True, separators=(',', ': '))
 
+    def gen_concepts_json(self):
+        data = {mi_id: a['concept_id'] for mi_id, a in self.mi_anno.occr.items() if a['concept_id'] is not None}
+
+        # compact since it is requested on every page load
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+    def gen_context_json(self):
+        res = request.args
+
+        mi_id, window = res.get('mi_id'), res.get('window', '10')
+        if mi_id not in self.context_index.occurrences or not window.isdigit():
+            abort(400)
+
+        start, pos, end = self.context_index.window(mi_id, int(window))
+        data = {
+            'paragraph': self.context_index.paragraph(mi_id),
+            'before': [{'id': w_id, 'text': text} for w_id, text in self.words[start:pos]],
+            'after': [{'id': w_id, 'text': text} for w_id, text in self.words[pos:end]],
+        }
+
+        return json.dumps(data, ensure_ascii=False, indent=4, sort_keys=True, separators=(',', ': '))
+
+    def gen_agreement_json(self):
+        if self.agreement is None:
+            abort(404)
+
+        data = self.agreement.to_dict()
+
+        return json.dumps(data, ensure_ascii=False, indent=4, sort_keys=True, separators=(',', ': '))
+
+    def gen_stats_json(self):
+        data = self.stats.to_dict(self.mcdict.concepts)
+
+        return json.dumps(data, ensure_ascii=False, indent=4, sort_keys=True, separators=(',', ': '))
+
+    def gen_occurrences_json(self):
+        res = request.args
+
+        idf_hex, idf_var = res.get('idf_hex'), res.get('idf_var')
+        if idf_hex is None or idf_var is None:
+            abort(400)
+
+        concept_id = res.get('concept_id')
+        if concept_id is not None:
+            if not concept_id.isdigit():
+                abort(400)
+            data = {'mi_ids': self.concept_index.occurrences(idf_hex, idf_var, int(concept_id))}
+
+        else:
+            nof_concepts = len(self.mcdict.concepts.get(idf_hex, dict()).get(idf_var, []))
+            data = {
+                'concepts': [self.concept_index.occurrences(idf_hex, idf_var, i) for i in range(nof_concepts)],
+                'unannotated': self.concept_index.unannotated(idf_hex, idf_var, nof_concepts),
+            }
+
+        return json.dumps(data, ensure_ascii=False, indent=4, sort_keys=True, separators=(',', ': '))
+
+    def gen_unannotated_json(self):
+        res = request.args
+
+        direction = res.get('direction', 'next')
+        if direction not in ('next', 'prev'):
+            abort(400)
+
+        idf_hex, idf_var = res.get('idf_hex'), res.get('idf_var')
+        idf = (idf_hex, idf_var) if idf_hex is not None and idf_var is not None else None
+
+        mi_id = self.unannotated_index.find(res.get('mi_id'), direction == 'prev', idf)
+        data = {'mi_id': mi_id}
+
+        return json.dumps(data, ensure_ascii=False, indent=4, sort_keys=True, separators=(',', ': '))
+
     def edit_mcdict(self):
         # Copy and paste of index.
         # Need to add main_content to calculate statistics for identifiers and concepts.
 
         # avoid destroying the original tree
-        copied_tree = deepcopy(self.tree)
-        root = copied_tree.getroot()
-
-        # add data-math-concept for each mi element
-        for mi in root.xpath('//mi'):
-            mi_id = mi.get('id', None)
-            if mi_id is None:
-                continue
-
-            concept_id = self.mi_anno.occr.get(mi_id, dict()).get('concept_id', None)
-            if concept_id is None:
-                continue
-
-            mi.attrib['data-math-concept'] = str(concept_id)
+        with self.metrics.timer('tree_copy'):
+            copied_tree = deepcopy(self.tree)
+            root = copied_tree.getroot()
+            self.stamp_concepts(root)
 
         # construction
         body = root.xpath('body')[0]
-        main_content = etree.tostring(body, method='html', encoding=str)
-        return render_template(
+        with self.metrics.timer('serialization'):
+            main_content = etree.tostring(body, method='html', encoding=str)
+        return self.render_template(
             'edit_mcdict.html',
             version=VERSION,
             git_revision=GIT_REVISON,
@@ -418,5 +655,89 @@ class MioGattoServer:
             main_content=Markup(main_content),
         )
 
-    def update_mcdict_edit_id(self):
+    def gen_metrics(self):
+        if not self.metrics.enabled:
+            abort(404)
+
+        return self.metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+    def gen_memory_json(self):
+        if not self.diagnostics.enabled:
+            abort(404)
+        if request.remote_addr not in LOCAL_ADDRS:
+            abort(403)
+
+        res = request.args
+        top = res.get('top', '10')
+        if not top.isdigit():
+            abort(400)
+
+        data = self.diagnostics.to_dict(self, int(top), res.get('reset') == '1')
+
+        return json.dumps(data, ensure_ascii=False, indent=4, sort_keys=True, separators=(',', ': '))
+
+    def idf_keys(self, mi_ids: list) -> list[tuple[str, str]]:
+        keys = []
+        for mi_id in mi_ids:
+            idf = self.mi2idf.get(mi_id)
+            if idf is not None:
+                keys.append((idf['idf_hex'], idf['idf_var']))
+
+        return keys
+
+    def check_mcdict_edit_id(self, res, idf_keys: list) -> bool:
+        # the concept lists used in the request must not be edited after the mcdict was loaded
+        edit_id = str(res.get('mcdict_edit_id'))
+        if edit_id.isdigit() and int(edit_id) <= self.mcdict_edit_id:
+            if all(self.idf_versions.get(k, 0) <= int(edit_id) for k in idf_keys):
+                return True
+
+        self.metrics.inc('miogatto_stale_edit_rejections_total', route=request.path)
+        return False
+
+    def render_template(self, template: str, **context):
+        with self.metrics.timer('render'):
+            return render_template(template, **context)
+
+    def dump_mi_anno(self):
+        with self.metrics.timer('dump'):
+            if self.writer is not None:
+                self.writer.save(self.mi_anno)
+            else:
+                self.mi_anno.dump()
+
+        self.notify('anno')
+
+    def dump_mcdict(self):
+        with self.metrics.timer('dump'):
+            if self.writer is not None:
+                self.writer.save(self.mcdict)
+            else:
+                self.mcdict.dump()
+
+    def notify(self, kind: str, **info):
+        if self.notifier is not None:
+            self.notifier.notify(dict(info, kind=kind, mcdict_edit_id=str(self.mcdict_edit_id)))
+
+    def set_concept(self, mi_id: str, concept_id: Optional[int]):
+        anno = self.mi_anno.occr[mi_id]
+
+        self.stats.change_concept(mi_id, anno['concept_id'], concept_id, len(anno['sog']))
+        self.concept_index.change_concept(mi_id, anno['concept_id'], concept_id)
+        self.unannotated_index.change_concept(mi_id, concept_id)
+        if self.agreement is not None:
+            self.agreement.change_concept(mi_id, anno['concept_id'], concept_id)
+        anno['concept_id'] = concept_id
+
+    def replace_anno(self, mi_id: str, new_anno: dict):
+        anno = self.mi_anno.occr[mi_id]
+
+        self.stats.change_sog(mi_id, anno['concept_id'], -len(anno['sog']))
+        self.set_concept(mi_id, new_anno['concept_id'])
+        anno['sog'] = new_anno['sog']
+        self.stats.change_sog(mi_id, anno['concept_id'], len(anno['sog']))
+
+    def update_mcdict_edit_id(self, idf_hex: str, idf_var: str):
         self.mcdict_edit_id += 1
+        self.idf_versions[(idf_hex, idf_var)] = self.mcdict_edit_id
+        self.notify('mcdict', idf_hex=idf_hex, idf_var=idf_var)
@@ -0,0 +1,71 @@
+# Document-ordered index of unannotated occurrences for the MioGatto server
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from typing import Optional
+
+from lib.annotation import MiAnno
+
+
+class UnannotatedIndex:
+    """Sorted positions of the unannotated occurrences
+
+    Positions are the ordinals of the occurrences in the document. The
+    positions are kept both for the whole paper and for each identifier,
+    so that the next/previous one can be found by binary search.
+    """
+
+    def __init__(self, mi_anno: MiAnno, mi2idf: dict) -> None:
+        self.mi_ids: list[str] = []
+        self.position: dict[str, int] = dict()
+        self.idf: dict[str, tuple[str, str]] = dict()
+
+        for mi_id, idf in mi2idf.items():
+            if idf is None or mi_id not in mi_anno.occr:
+                continue
+
+            self.position[mi_id] = len(self.mi_ids)
+            self.mi_ids.append(mi_id)
+            self.idf[mi_id] = (idf['idf_hex'], idf['idf_var'])
+
+        # bitmap and sorted arrays of the unannotated positions
+        self.unannotated = bytearray(len(self.mi_ids))
+        self.all_pos: list[int] = []
+        self.idf_pos: defaultdict = defaultdict(list)
+
+        for pos, mi_id in enumerate(self.mi_ids):
+            if mi_anno.occr[mi_id]['concept_id'] is None:
+                self.unannotated[pos] = 1
+                self.all_pos.append(pos)
+                self.idf_pos[self.idf[mi_id]].append(pos)
+
+    def change_concept(self, mi_id: str, concept_id: Optional[int]) -> None:
+        pos = self.position.get(mi_id)
+        if pos is None:
+            return
+
+        flag = 1 if concept_id is None else 0
+        if self.unannotated[pos] == flag:
+            return
+
+        self.unannotated[pos] = flag
+        for ls in (self.all_pos, self.idf_pos[self.idf[mi_id]]):
+            if flag:
+                insort(ls, pos)
+            else:
+                del ls[bisect_left(ls, pos)]
+
+    def find(self, mi_id: Optional[str], backward: bool = False, idf: Optional[tuple] = None) -> Optional[str]:
+        """Find the next (or previous) unannotated occurrence with wrapping around"""
+        ls = self.all_pos if idf is None else self.idf_pos.get(idf, [])
+        if len(ls) == 0:
+            return None
+
+        # start from the beginning (or the end) for unknown mi_id
+        pos = self.position.get(mi_id) if mi_id is not None else None
+
+        if backward:
+            i = bisect_left(ls, pos) - 1 if pos is not None else len(ls) - 1
+            return self.mi_ids[ls[i]]
+        else:
+            i = bisect_right(ls, pos) if pos is not None else 0
+            return self.mi_ids[ls[i % len(ls)]]
@@ -0,0 +1,29 @@
+# Precompressed static body of the paper for the MioGatto server
+import gzip
+from pathlib import Path
+from lxml import etree
+
+
+def gzip_file(file: Path) -> Path:
+    return file.with_name(file.name + '.gz')
+
+
+def is_up_to_date(body_file: Path, source_file: Path) -> bool:
+    for f in (body_file, gzip_file(body_file)):
+        if not f.exists() or f.stat().st_mtime < source_file.stat().st_mtime:
+            return False
+
+    return True
+
+
+def build_static_body(tree, body_file: Path) -> None:
+    """Write the serialized body (without concepts) and its gzip-compressed version"""
+    body = tree.getroot().xpath('body')[0]
+    content = etree.tostring(body, method='html', encoding='utf-8')
+
+    body_file.write_bytes(content)
+
+    # mtime=0 for reproducible outputs
+    with open(gzip_file(body_file), 'wb') as f:
+        with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=9, mtime=0) as gz:
+            gz.write(content)
@@ -0,0 +1,87 @@
+# Incremental statistics for the MioGatto server
+from collections import Counter
+from typing import Optional
+
+from lib.annotation import MiAnno
+
+
+class AnnotationStats:
+    """Progress counters maintained on each mutation of the annotation"""
+
+    def __init__(self, mi_anno: MiAnno, mi2idf: dict) -> None:
+        self.mi2idf = mi2idf
+
+        self.nof_anno = len(mi_anno.occr)
+        self.nof_done = 0
+        self.nof_sog = 0
+
+        # keys are (idf_hex, idf_var) and (idf_hex, idf_var, concept_id)
+        self.idf_occr: Counter = Counter()
+        self.idf_done: Counter = Counter()
+        self.concept_occr: Counter = Counter()
+        self.concept_sog: Counter = Counter()
+
+        for mi_id, anno in mi_anno.occr.items():
+            idf = self.get_idf(mi_id)
+            if idf is not None:
+                self.idf_occr[idf] += 1
+
+            self.__add_concept(mi_id, anno['concept_id'], len(anno['sog']))
+            self.nof_sog += len(anno['sog'])
+
+    def get_idf(self, mi_id: str) -> Optional[tuple[str, str]]:
+        idf = self.mi2idf.get(mi_id)
+        if idf is None:
+            return None
+
+        return idf['idf_hex'], idf['idf_var']
+
+    def __add_concept(self, mi_id: str, concept_id: Optional[int], nof_sog: int, sign: int = 1) -> None:
+        if concept_id is None:
+            return
+
+        self.nof_done += sign
+
+        idf = self.get_idf(mi_id)
+        if idf is None:
+            return
+
+        self.idf_done[idf] += sign
+        self.concept_occr[(*idf, concept_id)] += sign
+        self.concept_sog[(*idf, concept_id)] += sign * nof_sog
+
+    def change_concept(self, mi_id: str, old_id: Optional[int], new_id: Optional[int], nof_sog: int) -> None:
+        self.__add_concept(mi_id, old_id, nof_sog, -1)
+        self.__add_concept(mi_id, new_id, nof_sog)
+
+    def change_sog(self, mi_id: str, concept_id: Optional[int], diff: int) -> None:
+        self.nof_sog += diff
+
+        idf = self.get_idf(mi_id)
+        if idf is not None and concept_id is not None:
+            self.concept_sog[(*idf, concept_id)] += diff
+
+    def p_concept(self) -> str:
+        return '{}/{} ({:.2f}%)'.format(self.nof_done, self.nof_anno, self.nof_done / self.nof_anno * 100)
+
+    def to_dict(self, concepts: dict) -> dict:
+        identifiers, concept_stats = dict(), dict()
+
+        for idf_hex, v in concepts.items():
+            identifiers[idf_hex], concept_stats[idf_hex] = dict(), dict()
+
+            for idf_var, cls in v.items():
+                idf = (idf_hex, idf_var)
+                identifiers[idf_hex][idf_var] = {'occurrences': self.idf_occr[idf], 'annotated': self.idf_done[idf]}
+                concept_stats[idf_hex][idf_var] = [
+                    {'occurrences': self.concept_occr[(*idf, i)], 'sog': self.concept_sog[(*idf, i)]}
+                    for i in range(len(cls))
+                ]
+
+        return {
+            'occurrences': self.nof_anno,
+            'annotated': self.nof_done,
+            'sog': self.nof_sog,
+            'identifiers': identifiers,
+            'concepts': concept_stats,
+        }
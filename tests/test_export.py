@@ -0,0 +1,42 @@
+# Tests of tools.export
+import json
+import pytest
+
+from lib.annotation import data_files
+from tools.synth import synthesize
+from tools.export import export_paper, parquet_schema, ParquetWriter
+
+
+def test_dangling_sog_is_skipped(tmp_path):
+    synthesize(tmp_path, 'paper', sections=1, paragraphs=2, words=20)
+    anno_file, _ = data_files(tmp_path / 'data', 'paper')
+
+    with open(anno_file) as f:
+        data = json.load(f)
+    mi_id, anno = next((k, v) for k, v in data['mi_anno'].items() if len(v['sog']) > 0)
+    sog = anno['sog'][0]
+    anno['sog'].append({'start': 'no-such-word', 'stop': sog['stop'], 'type': 0})
+    with open(anno_file, 'w') as f:
+        json.dump(data, f)
+
+    rows = export_paper('paper', tmp_path / 'data', tmp_path / 'sources', 'json', 5, False)
+
+    row = next(r for r in rows if r['mi_id'] == mi_id)
+    assert [s['start'] for s in row['sog']] == [s['start'] for s in anno['sog'][:-1]]
+    assert len(rows) == sum(a['concept_id'] is not None for a in data['mi_anno'].values())
+
+
+def test_parquet_schema_does_not_depend_on_the_first_paper(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    synthesize(tmp_path, 'paper', sections=1, paragraphs=2, words=20)
+    rows = export_paper('paper', tmp_path / 'data', tmp_path / 'sources', 'json', 5, True)
+    assert set(rows[0]) == set(parquet_schema().names)
+
+    # no SoG and no description in the first write
+    empty = [dict(rows[0], sog=[], description=None, concept_id=None, arity=None, affixes=[])]
+    writer = ParquetWriter(tmp_path / 'out.parquet')
+    writer.write(empty)
+    writer.write(rows)
+    writer.close()
+
+    assert pq.read_table(tmp_path / 'out.parquet').num_rows == len(rows) + 1
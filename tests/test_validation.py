@@ -0,0 +1,41 @@
+# Tests of tools.validate
+import json
+import pytest
+
+from lib.annotation import data_files
+from tools.synth import synthesize
+from tools.validate import validate_paper
+
+
+def break_mcdict_entry(data):
+    data['concepts'][next(iter(data['concepts']))] = 'x'
+    return data
+
+
+def break_sog_start(data):
+    anno = next(a for a in data['mi_anno'].values() if len(a['sog']) > 0)
+    anno['sog'][0]['start'] = ['x']
+    return data
+
+
+@pytest.mark.parametrize(
+    'kind, corrupt',
+    [
+        ('anno', lambda data: [data]),
+        ('anno', lambda data: dict(data, mi_anno=list(data['mi_anno']))),
+        ('mcdict', break_mcdict_entry),
+        ('anno', break_sog_start),
+    ],
+)
+def test_malformed_data_is_reported(tmp_path, kind, corrupt):
+    synthesize(tmp_path, 'paper', sections=1, paragraphs=2, words=20, p_sog=1.0)
+    anno_file, mcdict_file = data_files(tmp_path / 'data', 'paper')
+    assert validate_paper('paper', tmp_path / 'data', tmp_path / 'sources', 'json') == []
+
+    file = anno_file if kind == 'anno' else mcdict_file
+    with open(file) as f:
+        data = corrupt(json.load(f))
+    with open(file, 'w') as f:
+        json.dump(data, f)
+
+    assert len(validate_paper('paper', tmp_path / 'data', tmp_path / 'sources', 'json')) > 0
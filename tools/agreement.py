@@ -7,8 +7,9 @@ from sklearn.metrics import cohen_kappa_score
 
 from lib.version import VERSION
 from lib.logger import main_logger
-from lib.util import get_mi2idf
-from lib.annotation import MiAnno, McDict
+from lib.profiler import Profiler
+from lib.util import get_mi2idf, expand_word_spans
+from lib.annotation import MiAnno, McDict, data_files
 
 # meta
 PROG_NAME = "tools.agreement"
@@ -22,10 +23,23 @@ Options:
     -r DIR, --reference=DIR
                     Dir for the reference data [default: ./data]
     --sources=DIR   Dir for preprocessed HTML [default: ./sources]
+    -f FMT, --format=FMT
+                    Format of the data files (json or msgpack) [default: json]
 
     -s, --show-mismatch  Show mismatch details
+    -b NUM, --bootstrap=NUM
+                    Show bootstrap confidence intervals with NUM resamples
+    --confidence=LEVEL
+                    Confidence level of the intervals [default: 0.95]
+    --seed=NUM      Random seed for the resampling
+    --profile       Dump profile into {p}.prof
+    --profile-out=FILE
+                    Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings       Show wall time of each phase
+    --memory        Show memory usage of each phase and top allocations
     -D, --debug     Show debug messages
     -q, --quiet     Show less messages
+    --log-json      Write log messages as JSON lines
 
     -h, --help      Show this screen and exit
     -V, --version   Show version
@@ -130,14 +144,67 @@ def calc_agreements(ref_mi_anno, target_mi_anno, ref_mcdict, mi_info, show_misma
     return pos, neg, pt_miss, labels
 
 
+def kappa_confusions(confusions: np.ndarray) -> np.ndarray:
+    """Cohen's kappa of each confusion matrix (in the shape of (N, L, L))"""
+    n = confusions.sum(axis=(1, 2))
+
+    p_o = np.trace(confusions, axis1=1, axis2=2) / n
+    p_e = (confusions.sum(axis=2) * confusions.sum(axis=1)).sum(axis=1) / (n * n)
+
+    return (p_o - p_e) / (1 - p_e)
+
+
+def bootstrap_cis(labels, n_resamples: int, confidence: float, rng: np.random.Generator):
+    """Percentile bootstrap intervals of the agreement, the kappas and the weighted average kappa
+
+    Resampling the occurrences with replacement is equivalent to drawing the
+    counts from a binomial (for the agreement) or a multinomial over the
+    cells of the confusion matrix (for the kappas), so all the resamples are
+    drawn at once regardless of the number of occurrences. The kappas are
+    resampled within each identifier.
+    """
+    q = [(1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100]
+
+    # agreement
+    nof_agreed = sum(g == t for gold, target in labels.values() for g, t in zip(gold, target))
+    total = sum(len(gold) for gold, _ in labels.values())
+    agreement_ci = np.percentile(rng.binomial(total, nof_agreed / total, n_resamples) / total, q)
+
+    # kappas for each identifier
+    kappas, counts, kappa_cis = [], [], dict()
+    for k, (gold, target) in labels.items():
+        codes = {c: i for i, c in enumerate(set(gold) | set(target))}
+        nof_labels = len(codes)
+
+        confusion = np.zeros(nof_labels * nof_labels)
+        for g, t in zip(gold, target):
+            confusion[codes[g] * nof_labels + codes[t]] += 1
+
+        resampled = rng.multinomial(len(gold), confusion / len(gold), n_resamples)
+        kappa = kappa_confusions(resampled.reshape(n_resamples, nof_labels, nof_labels))
+
+        kappa_cis[k] = np.nanpercentile(kappa, q) if not np.isnan(kappa).all() else (np.nan, np.nan)
+        kappas.append(kappa)
+        counts.append(len(gold))
+
+    # weighted average over the identifiers with defined kappas
+    kappas = np.array(kappas)
+    weights = np.where(np.isnan(kappas), 0, np.array(counts)[:, None])
+    w_kappa = np.nansum(kappas * weights, axis=0) / weights.sum(axis=0)
+    w_kappa_ci = np.nanpercentile(w_kappa, q)
+
+    return agreement_ci, kappa_cis, w_kappa_ci
+
+
 def sog_match(ref_mi_anno, target_mi_anno, word_list):
+    word_pos = {w: i for i, w in reversed(list(enumerate(word_list)))}
     ref_sogs = [
-        ((word_list.index(sog[0]), word_list.index(sog[1])), anno['concept_id'])
+        ((word_pos[sog['start']], word_pos[sog['stop']]), anno['concept_id'])
         for anno in ref_mi_anno.occr.values()
         for sog in anno['sog']
     ]
     target_sogs = [
-        ((word_list.index(sog[0]), word_list.index(sog[1])), anno['concept_id'])
+        ((word_pos[sog['start']], word_pos[sog['stop']]), anno['concept_id'])
         for anno in target_mi_anno.occr.values()
         for sog in anno['sog']
     ]
@@ -166,7 +233,9 @@ def main():
     # parse options
     args = docopt(HELP, version=VERSION)
 
-    main_logger.set_logger(args['--quiet'], args['--debug'])
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
     paper_id = args['ID']
     show_mismatch = args['--show-mismatch']
 
@@ -175,17 +244,16 @@ def main():
         logger.critical('Option --target (-t) is required')
         exit(1)
     target_dir = Path(args['--target'])
-    target_anno_json = target_dir / '{}_anno.json'.format(paper_id)
-    target_mcdict_json = target_dir / '{}_mcdict.json'.format(paper_id)
+    target_anno_json, target_mcdict_json = data_files(target_dir, paper_id, args['--format'])
 
     ref_dir = Path(args['--reference'])
-    ref_anno_json = ref_dir / '{}_anno.json'.format(paper_id)
-    ref_mcdict_json = ref_dir / '{}_mcdict.json'.format(paper_id)
+    ref_anno_json, ref_mcdict_json = data_files(ref_dir, paper_id, args['--format'])
 
     sources_dir = Path(args['--sources'])
     source_html = sources_dir / '{}.html'.format(paper_id)
 
     # load the target data
+    profiler.phase('parse')
     target_mi_anno = MiAnno(target_anno_json)
     target_mcdict = McDict(target_mcdict_json)
 
@@ -195,20 +263,37 @@ def main():
 
     # load the source HTML and extract information
     tree = lxml.html.parse(str(source_html))
+    expand_word_spans(tree.getroot(), spaces=False)
+
+    profiler.phase('mi extraction')
     mi_info, word_list = extract_info(tree)
 
+    profiler.phase('analysis')
     pos, neg, pt_miss, labels = calc_agreements(ref_mi_anno, target_mi_anno, ref_mcdict, mi_info, show_mismatch)
 
     nof_ref_sogs, nof_target_sogs, pos_sog_match, neg_sog_match = sog_match(ref_mi_anno, target_mi_anno, word_list)
 
+    # the intervals are shown after the point estimates
+    cis, ci_label = None, ''
+    if args['--bootstrap'] is not None:
+        profiler.phase('bootstrap')
+        rng = np.random.default_rng(int(args['--seed']) if args['--seed'] is not None else None)
+        confidence = float(args['--confidence'])
+        cis = bootstrap_cis(labels, int(args['--bootstrap']), confidence, rng)
+        ci_label = '{:g}% CI'.format(confidence * 100)
+
     # show results
+    profiler.phase('output')
     total = pos + neg
     print('* Summary')
     print('Reference data: Annotation by {}, Math concept dict by {}'.format(ref_mi_anno.annotator, ref_mcdict.author))
     print(
         'Target data: Annotation by {}, Math concept dict by {}'.format(target_mi_anno.annotator, target_mcdict.author)
     )
-    print('Agreement: {}/{} = {:.2f}%'.format(pos, total, pos / total * 100))
+    print('Agreement: {}/{} = {:.2f}%'.format(pos, total, pos / total * 100), end='')
+    if cis is not None:
+        print(' ({}: {:.2f}-{:.2f}%)'.format(ci_label, cis[0][0] * 100, cis[0][1] * 100), end='')
+    print()
     if neg > 0:
         rate = pt_miss / neg * 100
         print('Pattern mismatches: {}/{} = {:.2f}%'.format(pt_miss, neg, rate))
@@ -228,13 +313,19 @@ def main():
         kappas.append((idf_hex, idf_var, kappa, count))
 
     w_sum, w_cnt = 0, 0
-    print('symbol\tvariation\tKappa\tcount')
+    print('symbol\tvariation\tKappa\tcount' + ('\t' + ci_label if cis is not None else ''))
     for res in sorted(kappas, key=lambda x: x[3], reverse=True):
-        print(bytes.fromhex(res[0]).decode(), res[1], '{:.3f}'.format(res[2]), res[3], sep='\t')
+        row = [bytes.fromhex(res[0]).decode(), res[1], '{:.3f}'.format(res[2]), res[3]]
+        if cis is not None:
+            row.append('{:.3f}-{:.3f}'.format(*cis[1][(res[0], res[1])]))
+        print(*row, sep='\t')
         if not np.isnan(res[2]):
             w_cnt += res[3]
             w_sum += res[2] * res[3]
-    print('Kappa (weighted avg.): %.3f' % (w_sum / w_cnt))
+    print('Kappa (weighted avg.): %.3f' % (w_sum / w_cnt), end='')
+    if cis is not None:
+        print(' ({}: {:.3f}-{:.3f})'.format(ci_label, *cis[2]), end='')
+    print()
 
 
 if __name__ == '__main__':
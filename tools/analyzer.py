@@ -9,8 +9,9 @@ from pathlib import Path
 
 from lib.version import VERSION
 from lib.logger import main_logger
-from lib.util import get_mi2idf
-from lib.annotation import MiAnno, McDict
+from lib.profiler import Profiler
+from lib.util import get_mi2idf, expand_word_spans
+from lib.annotation import MiAnno, McDict, data_files
 
 # meta
 PROG_NAME = "tools.analyzer"
@@ -23,9 +24,16 @@ Options:
     -o DIR, --out=DIR   Dir to save results
     -d DIR, --data=DIR  Dir for the gold data [default: ./data]
     --sources=DIR       Dir for preprocessed HTML [default: ./sources]
+    -f FMT, --format=FMT
+                        Format of the data files (json or msgpack) [default: json]
 
+    --profile           Dump profile into {p}.prof
+    --profile-out=FILE  Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings           Show wall time of each phase
+    --memory            Show memory usage of each phase and top allocations
     -D, --debug         Show debug messages
     -q, --quiet         Show less messages
+    --log-json          Write log messages as JSON lines
 
     -h, --help          Show this screen and exit
     -V, --version       Show version
@@ -64,7 +72,7 @@ def extract_info(tree, mi2idf):
         pos = html_str.find(lxml.html.tostring(e, encoding='utf-8').decode('utf-8'))
         sec_info[sec_id] = pos
 
-    logger.debug('{sec_info=}')
+    logger.debug('sec_info=%s', sec_info)
 
     return mi_info, sec_info
 
@@ -107,7 +115,7 @@ def analyze_annotation(paper_id, tree, mi_anno, mcdict, mi_info, mi2idf):
         key=lambda x: x[2],
         reverse=True,
     )
-    logger.debug(f'{items=}')
+    logger.debug('items=%s', items)
     nof_items = np.array([i[2] for i in items])
 
     print('* Math concept dictionary')
@@ -196,9 +204,9 @@ def analyze_annotation(paper_id, tree, mi_anno, mcdict, mi_info, mi2idf):
             logger.warning('    %s > %s > %d (%s)', surface, idf_var, cid, desc)
 
     # output for debugging
-    logger.debug(f'{concept_dict=}')
-    logger.debug(f'{occurences=}')
-    logger.debug(f'{candidates=}')
+    logger.debug('concept_dict=%s', concept_dict)
+    logger.debug('occurences=%s', occurences)
+    logger.debug('candidates=%s', candidates)
 
     return items, concept_dict, occurences
 
@@ -257,7 +265,9 @@ def main():
     # parse options
     args = docopt(HELP, version=VERSION)
 
-    main_logger.set_logger(args['--quiet'], args['--debug'])
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
     paper_id = args['ID']
 
     # dirs and files
@@ -266,22 +276,27 @@ def main():
     sources_dir = Path(args['--sources'])
     source_html = sources_dir / '{}.html'.format(paper_id)
 
-    anno_json = data_dir / '{}_anno.json'.format(paper_id)
-    mcdict_json = data_dir / '{}_mcdict.json'.format(paper_id)
+    anno_json, mcdict_json = data_files(data_dir, paper_id, args['--format'])
 
     # load the data
+    profiler.phase('parse')
     mi_anno = MiAnno(anno_json)
     mcdict = McDict(mcdict_json)
 
     # load the source HTML and extract information
     tree = lxml.html.parse(str(source_html))
+    expand_word_spans(tree.getroot())
+
+    profiler.phase('mi extraction')
     mi2idf = get_mi2idf(tree)
     mi_info, sec_info = extract_info(tree, mi2idf)
 
+    profiler.phase('analysis')
     items, concept_dict, occurences = analyze_annotation(paper_id, tree, mi_anno, mcdict, mi_info, mi2idf)
 
     # supplementary graphs
     if args['--out'] is not None:
+        profiler.phase('output')
         out_dir = Path(args['--out'])
         export_graphs(paper_id, items, concept_dict, occurences, sec_info, out_dir)
 
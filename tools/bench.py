@@ -0,0 +1,181 @@
+# Benchmark suite for MioGatto
+import json
+import logging
+import statistics
+import tempfile
+import time
+import lxml.html
+from docopt import docopt
+from pathlib import Path
+
+from lib.version import VERSION
+from lib.logger import main_logger
+from lib.profiler import Profiler
+from lib.util import get_mi2idf
+from lib.annotation import MiAnno, McDict, data_files
+from tools.synth import synthesize
+from tools.preprocess import preprocess_html
+from tools.agreement import extract_info, sog_match
+
+# meta
+PROG_NAME = "tools.bench"
+HELP = """Benchmark suite for MioGatto
+
+Usage:
+    {p} run [options]
+    {p} compare [options] BASELINE RESULT
+
+Options:
+    --sizes=NUMS        Comma-separated numbers of sections of the synthetic
+                        papers [default: 1,10,50]
+    -n NUM, --repeat=NUM
+                        Number of repetitions for each benchmark [default: 5]
+    -o FILE, --out=FILE
+                        Save the result as JSON (e.g., for a baseline)
+    --threshold=RATE    Slowdown rate regarded as a regression [default: 0.2]
+
+    --profile           Dump profile into {p}.prof
+    --profile-out=FILE  Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings           Show wall time of each phase
+    --memory            Show memory usage of each phase and top allocations
+    -D, --debug         Show debug messages
+    -q, --quiet         Show less messages
+    --log-json          Write log messages as JSON lines
+
+    -h, --help          Show this screen and exit
+    -V, --version       Show version
+""".format(
+    p=PROG_NAME
+)
+
+logger = main_logger.getChild(PROG_NAME)
+
+
+def measure(func, repeat: int, setup=None) -> dict:
+    """Time func for repeat times (setup is excluded from the timings)"""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        t0 = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - t0)
+
+    return {'min': min(times), 'median': statistics.median(times)}
+
+
+def bench_paper(work_dir: Path, paper_id: str, repeat: int) -> dict:
+    # importing the app is not needed for the other benchmarks
+    from server.__main__ import app
+    from server.miogatto import MioGattoServer
+
+    raw_html = (work_dir / '{}.html'.format(paper_id)).read_bytes()
+    source_html = work_dir / 'sources' / '{}.html'.format(paper_id)
+    anno_file, mcdict_file = data_files(work_dir / 'data', paper_id)
+    tmp_file = work_dir / '.bench_anno.json'
+
+    tree = lxml.html.parse(str(source_html))
+    mi_anno, mcdict = MiAnno(anno_file), McDict(mcdict_file)
+
+    # keep the server logs away from the results
+    server_logger = logging.getLogger(PROG_NAME + '.server')
+    server_logger.disabled = True
+    server = MioGattoServer(paper_id, tree, mi_anno, mcdict, server_logger)
+
+    def render(_):
+        with app.test_request_context('/'):
+            server.index()
+
+    _, word_list = extract_info(tree)
+
+    return {
+        'preprocess_html': measure(
+            lambda t: preprocess_html(t, paper_id, True), repeat, lambda: lxml.html.fromstring(raw_html).getroottree()
+        ),
+        'get_mi2idf': measure(lambda _: get_mi2idf(tree), repeat),
+        'index': measure(render, repeat),
+        'anno_dump': measure(lambda _: mi_anno.dump(tmp_file), repeat),
+        'sog_match': measure(lambda _: sog_match(mi_anno, mi_anno, word_list), repeat),
+    }
+
+
+def run(sizes: list[int], repeat: int) -> dict:
+    results = dict()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            work_dir = Path(tmp_dir) / str(size)
+            synthesize(work_dir, 'bench', sections=size)
+
+            logger.info('Running the benchmarks with %d sections', size)
+            results[str(size)] = bench_paper(work_dir, 'bench', repeat)
+
+    return {'_version': VERSION, 'repeat': repeat, 'results': results}
+
+
+def compare(baseline: dict, result: dict, threshold: float) -> int:
+    """Print the ratios of the median times and return the number of regressions"""
+    regressions = 0
+
+    print('size\tbenchmark\tbaseline (ms)\tresult (ms)\tratio')
+    for size, benchmarks in result['results'].items():
+        for name, t in benchmarks.items():
+            t_base = baseline['results'].get(size, dict()).get(name)
+            if t_base is None:
+                continue
+
+            ratio = t['median'] / t_base['median']
+            mark = ''
+            if ratio > 1 + threshold:
+                mark = '\tREGRESSION'
+                regressions += 1
+
+            print(
+                size,
+                name,
+                '{:.2f}'.format(t_base['median'] * 1000),
+                '{:.2f}'.format(t['median'] * 1000),
+                '{:.2f}{}'.format(ratio, mark),
+                sep='\t',
+            )
+
+    return regressions
+
+
+def main():
+    # parse options
+    args = docopt(HELP, version=VERSION)
+
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
+
+    if args['run']:
+        profiler.phase('bench')
+        sizes = [int(s) for s in args['--sizes'].split(',')]
+        data = run(sizes, int(args['--repeat']))
+
+        profiler.phase('output')
+        print('size\tbenchmark\tmin (ms)\tmedian (ms)')
+        for size, benchmarks in data['results'].items():
+            for name, t in benchmarks.items():
+                print(size, name, '{:.2f}'.format(t['min'] * 1000), '{:.2f}'.format(t['median'] * 1000), sep='\t')
+
+        if args['--out'] is not None:
+            with open(args['--out'], 'w') as f:
+                json.dump(data, f, ensure_ascii=False, indent=4, sort_keys=True, separators=(',', ': '))
+
+    elif args['compare']:
+        profiler.phase('compare')
+        with open(args['BASELINE']) as f:
+            baseline = json.load(f)
+        with open(args['RESULT']) as f:
+            result = json.load(f)
+
+        regressions = compare(baseline, result, float(args['--threshold']))
+        if regressions > 0:
+            logger.error('%d regressions found', regressions)
+            exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# Corpus-wide concept dictionary tool for MioGatto
+from docopt import docopt
+from pathlib import Path
+
+from lib.version import VERSION
+from lib.logger import main_logger
+from lib.profiler import Profiler
+from lib.concept_dict import ConceptDict
+
+# meta
+PROG_NAME = "tools.concepts"
+HELP = """Corpus-wide concept dictionary tool for MioGatto
+
+Usage:
+    {p} update [options]
+    {p} lookup [options] IDF [VAR]
+
+Options:
+    -c FILE, --dict=FILE
+                        SQLite file for the dictionary [default: ./concepts.sqlite]
+    -d DIR, --data=DIR  Dir for the data [default: ./data]
+    --sources=DIR       Dir for preprocessed HTML [default: ./sources]
+    -f FMT, --format=FMT
+                        Format of the data files (json or msgpack) [default: json]
+    -n NUM, --limit=NUM
+                        Number of concepts to show [default: 10]
+
+    --profile           Dump profile into {p}.prof
+    --profile-out=FILE  Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings           Show wall time of each phase
+    --memory            Show memory usage of each phase and top allocations
+    -D, --debug         Show debug messages
+    -q, --quiet         Show less messages
+    --log-json          Write log messages as JSON lines
+
+    -h, --help          Show this screen and exit
+    -V, --version       Show version
+""".format(
+    p=PROG_NAME
+)
+
+logger = main_logger.getChild(PROG_NAME)
+
+
+def main():
+    # parse options
+    args = docopt(HELP, version=VERSION)
+
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
+
+    concept_dict = ConceptDict(Path(args['--dict']))
+
+    if args['update']:
+        profiler.phase('update')
+        updated, removed = concept_dict.update(Path(args['--data']), Path(args['--sources']), args['--format'])
+        logger.info('Updated %d papers and removed %d papers', updated, removed)
+
+    elif args['lookup']:
+        profiler.phase('query')
+        idf_hex = args['IDF'].encode().hex()
+        idf_vars = [args['VAR']] if args['VAR'] is not None else concept_dict.variations(idf_hex)
+
+        print('variation\tpapers\toccurrences\tarity\taffixes\tdescription')
+        for idf_var in idf_vars:
+            for c, nof_papers, nof_occr in concept_dict.lookup(idf_hex, idf_var, int(args['--limit'])):
+                print(idf_var, nof_papers, nof_occr, c.arity, ','.join(c.affixes), c.description, sep='\t')
+
+    concept_dict.close()
+
+
+if __name__ == '__main__':
+    main()
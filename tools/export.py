@@ -0,0 +1,327 @@
+# Dataset export tool for MioGatto
+import json
+import lxml.html
+from functools import cache
+from docopt import docopt
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from lib.version import VERSION
+from lib.logger import main_logger, init_worker
+from lib.profiler import Profiler
+from lib.util import get_mi2idf, expand_word_spans
+from lib.annotation import MiAnno, McDict, data_files, dump_json
+from lib.context import ContextIndex, context_file
+
+# meta
+PROG_NAME = "tools.export"
+HELP = """Dataset export tool for MioGatto
+
+Usage:
+    {p} [options] OUT_DIR [ID...]
+
+Options:
+    -d DIR, --data=DIR  Dir for the data [default: ./data]
+    --sources=DIR       Dir for preprocessed HTML [default: ./sources]
+    -f FMT, --format=FMT
+                        Format of the data files (json or msgpack) [default: json]
+
+    -o FMT, --output=FMT
+                        Output format (jsonl or parquet) [default: jsonl]
+    -s NUM, --shard-size=NUM
+                        Minimum number of rows in a shard [default: 100000]
+    -w NUM, --window=NUM
+                        Number of words before/after an occurrence in the paragraph [default: 10]
+    --all               Export the unannotated occurrences as well
+    --resume            Skip the papers already exported to OUT_DIR
+    -j NUM, --jobs=NUM  Number of worker processes (0 for the number of CPUs) [default: 0]
+
+    --profile           Dump profile into {p}.prof
+    --profile-out=FILE  Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings           Show wall time of each phase
+    --memory            Show memory usage of each phase and top allocations
+    -D, --debug         Show debug messages
+    -q, --quiet         Show less messages
+    --log-json          Write log messages as JSON lines
+
+    -h, --help          Show this screen and exit
+    -V, --version       Show version
+""".format(
+    p=PROG_NAME
+)
+
+logger = main_logger.getChild(PROG_NAME)
+
+MANIFEST = 'manifest.json'
+
+
+def word_positions(root) -> tuple[list[str], dict[str, int]]:
+    """Get the words and their positions (the same ordinals as ContextIndex)"""
+    words, word_pos = [], dict()
+
+    for e in root.xpath('//span[@class="gd_word"]'):
+        word_pos[e.get('id')] = len(words)
+        words.append(e.text or '')
+
+    return words, word_pos
+
+
+def join_words(words: list[str]) -> str:
+    return ' '.join(w for w in words if w != '')
+
+
+def sog_rows(paper_id: str, mi_id: str, sogs: list, words: list[str], word_pos: dict) -> list:
+    """Make the SoG entries of an occurrence, skipping the ones inconsistent with the source"""
+    rows = []
+    for s in sogs:
+        try:
+            start, stop = word_pos[s['start']], word_pos[s['stop']]
+            rows.append(
+                {
+                    'start': s['start'],
+                    'stop': s['stop'],
+                    'type': int(s['type']),
+                    'text': join_words(words[start : stop + 1]),
+                }
+            )
+        except (KeyError, TypeError, ValueError):
+            logger.warning('%s: SoG %s of %s is not consistent with the source, skipped', paper_id, s, mi_id)
+
+    return rows
+
+
+def export_paper(paper_id: str, data_dir: Path, sources_dir: Path, fmt: str, window: int, include_all: bool) -> list:
+    """Make the rows of a paper (run in the worker processes)"""
+    anno_file, mcdict_file = data_files(data_dir, paper_id, fmt)
+    mi_anno, mcdict = MiAnno(anno_file), McDict(mcdict_file)
+
+    tree = lxml.html.parse(str(sources_dir / '{}.html'.format(paper_id)))
+    expand_word_spans(tree.getroot(), spaces=False)
+    mi2idf = get_mi2idf(tree)
+    words, word_pos = word_positions(tree.getroot())
+
+    context_json = context_file(sources_dir, paper_id)
+    context_index = ContextIndex.load(context_json) if context_json.exists() else ContextIndex.build(tree)
+
+    rows = []
+    for mi_id, anno in mi_anno.occr.items():
+        concept_id = anno['concept_id']
+        if concept_id is None and not include_all:
+            continue
+
+        # an inconsistent occurrence should not abort the whole export
+        idf = mi2idf.get(mi_id)
+        if idf is None or idf['idf_hex'] not in mcdict.surfaces:
+            logger.warning('%s: %s is not a known identifier, skipped', paper_id, mi_id)
+            continue
+
+        idf_hex, idf_var = idf['idf_hex'], idf['idf_var']
+        try:
+            concept = mcdict.concepts[idf_hex][idf_var][concept_id] if concept_id is not None else None
+        except (KeyError, IndexError, TypeError):
+            logger.warning('%s: %s has no concept %s in the mcdict, skipped', paper_id, mi_id, concept_id)
+            continue
+
+        # the context index may be stale against the source
+        try:
+            start, pos, end = context_index.window(mi_id, window)
+            paragraph = context_index.paragraph(mi_id)
+        except (KeyError, IndexError, TypeError, ValueError):
+            logger.warning('%s: %s is not in the context index, skipped', paper_id, mi_id)
+            continue
+
+        sog = sog_rows(paper_id, mi_id, anno['sog'], words, word_pos)
+        rows.append(
+            {
+                'paper_id': paper_id,
+                'mi_id': mi_id,
+                'idf_hex': idf_hex,
+                'idf_var': idf_var,
+                'surface': mcdict.surfaces[idf_hex]['text'],
+                'concept_id': concept_id,
+                'description': concept.description if concept is not None else None,
+                'arity': concept.arity if concept is not None else None,
+                'affixes': concept.affixes if concept is not None else [],
+                'sog': sog,
+                'paragraph': paragraph,
+                'context_before': join_words(words[start:pos]),
+                'context_after': join_words(words[pos:end]),
+            }
+        )
+
+    return rows
+
+
+class JsonlWriter:
+    suffix = '.jsonl'
+
+    def __init__(self, file: Path) -> None:
+        self.f = open(file, 'w')
+
+    def write(self, rows: list) -> None:
+        for row in rows:
+            self.f.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    def close(self) -> None:
+        self.f.close()
+
+
+@cache
+def parquet_schema():
+    """The layout of the rows (pyarrow is imported only for the Parquet output)
+
+    Inferring it from the first paper would give null types to the columns
+    that happen to be empty there (e.g., no SoG at all).
+    """
+    import pyarrow as pa
+
+    sog = pa.struct([('start', pa.string()), ('stop', pa.string()), ('type', pa.int64()), ('text', pa.string())])
+    return pa.schema(
+        [
+            ('paper_id', pa.string()),
+            ('mi_id', pa.string()),
+            ('idf_hex', pa.string()),
+            ('idf_var', pa.string()),
+            ('surface', pa.string()),
+            ('concept_id', pa.int64()),
+            ('description', pa.string()),
+            ('arity', pa.int64()),
+            ('affixes', pa.list_(pa.string())),
+            ('sog', pa.list_(sog)),
+            ('paragraph', pa.string()),
+            ('context_before', pa.string()),
+            ('context_after', pa.string()),
+        ]
+    )
+
+
+class ParquetWriter:
+    suffix = '.parquet'
+
+    def __init__(self, file: Path) -> None:
+        self.file = file
+        self.writer = None
+
+    def write(self, rows: list) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if len(rows) == 0:
+            return
+
+        table = pa.Table.from_pylist(rows, schema=parquet_schema())
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(str(self.file), parquet_schema())
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+WRITERS = {
+    'jsonl': JsonlWriter,
+    'parquet': ParquetWriter,
+}
+
+
+def iter_rows(paper_ids: list, jobs, *args):
+    """Yield the rows of each paper keeping a limited number of papers in flight"""
+    chunk_size = (jobs or 8) * 2
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=main_logger.settings) as executor:
+        for i in range(0, len(paper_ids), chunk_size):
+            chunk = paper_ids[i : i + chunk_size]
+            n = len(chunk)
+            yield from zip(chunk, executor.map(export_paper, chunk, *[[a] * n for a in args]))
+
+
+def load_manifest(out_dir: Path, output: str) -> dict:
+    with open(out_dir / MANIFEST) as f:
+        manifest = json.load(f)
+
+    if manifest['output'] != output:
+        raise ValueError('{} has been exported as {}'.format(out_dir, manifest['output']))
+
+    return manifest
+
+
+def main():
+    # parse options
+    args = docopt(HELP, version=VERSION)
+
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
+
+    data_dir = Path(args['--data'])
+    sources_dir = Path(args['--sources'])
+    out_dir = Path(args['OUT_DIR'])
+    fmt, output = args['--format'], args['--output']
+    shard_size = int(args['--shard-size'])
+    jobs = int(args['--jobs']) or None
+
+    if output not in WRITERS:
+        logger.error('Unknown output format: %s', output)
+        exit(1)
+
+    if output == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            logger.error('pyarrow is required for the Parquet output')
+            exit(1)
+
+    paper_ids = args['ID']
+    if len(paper_ids) == 0:
+        suffix = data_files(data_dir, '', fmt)[0].name
+        paper_ids = sorted(f.name[: -len(suffix)] for f in data_dir.glob('*' + suffix))
+
+    # the papers in the completed shards are skipped on resume
+    if args['--resume'] and (out_dir / MANIFEST).exists():
+        manifest = load_manifest(out_dir, output)
+        done = {p for shard in manifest['shards'] for p in shard['papers']}
+        paper_ids = [p for p in paper_ids if p not in done]
+        logger.info('Resuming: %d papers have been exported', len(done))
+    elif out_dir.exists() and any(out_dir.iterdir()):
+        logger.error('%s is not empty. Use --resume to continue', out_dir)
+        exit(1)
+    else:
+        manifest = {'output': output, 'shards': []}
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    def write_manifest():
+        with open(out_dir / MANIFEST, 'w') as f:
+            dump_json(manifest, f)
+
+    # shards are closed at paper boundaries
+    profiler.phase('export')
+    writer, shard = None, None
+    rows_args = (data_dir, sources_dir, fmt, int(args['--window']), args['--all'])
+
+    for paper_id, rows in iter_rows(paper_ids, jobs, *rows_args):
+        if writer is None:
+            name = 'part-{:05d}{}'.format(len(manifest['shards']), WRITERS[output].suffix)
+            writer, shard = WRITERS[output](out_dir / name), {'file': name, 'papers': [], 'rows': 0}
+
+        writer.write(rows)
+        shard['papers'].append(paper_id)
+        shard['rows'] += len(rows)
+        logger.debug('Exported %d rows of paper "%s"', len(rows), paper_id)
+
+        if shard['rows'] >= shard_size:
+            writer.close()
+            manifest['shards'].append(shard)
+            write_manifest()
+            writer = None
+
+    if writer is not None:
+        writer.close()
+        manifest['shards'].append(shard)
+    write_manifest()
+
+    logger.info('Exported %d rows in %d shards', sum(s['rows'] for s in manifest['shards']), len(manifest['shards']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+# Load-testing tool for the MioGatto server
+import json
+import random
+import logging
+import tempfile
+import time
+import lxml.html
+import numpy as np
+from collections import defaultdict
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from docopt import docopt
+from pathlib import Path
+
+from lib.version import VERSION
+from lib.logger import main_logger
+from lib.profiler import Profiler
+from lib.util import get_mi2idf
+from lib.annotation import MiAnno, McDict, data_files
+from tools.synth import synthesize
+
+# meta
+PROG_NAME = "tools.loadtest"
+HELP = """Load-testing tool for the MioGatto server
+
+Usage:
+    {p} [options]
+
+Options:
+    -c NUM, --concurrency=NUM
+                        Number of concurrent annotator sessions [default: 4]
+    -n NUM, --actions=NUM
+                        Number of actions in each session [default: 100]
+    --sections=NUM      Number of sections of the synthetic paper [default: 10]
+    --edit-rate=RATE    Rate of mcdict edits among the actions [default: 0.02]
+    --reload-rate=RATE  Rate of page loads among the actions [default: 0.05]
+    --lazy-sections     Run the server with --lazy-sections
+    --static-body       Run the server with --static-body
+    --seed=NUM          Random seed [default: 0]
+    -o FILE, --out=FILE
+                        Save the report as JSON
+
+    --profile           Dump profile into {p}.prof
+    --profile-out=FILE  Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings           Show wall time of each phase
+    --memory            Show memory usage of each phase and top allocations
+    -D, --debug         Show debug messages
+    -q, --quiet         Show less messages
+    --log-json          Write log messages as JSON lines
+
+    -h, --help          Show this screen and exit
+    -V, --version       Show version
+""".format(
+    p=PROG_NAME
+)
+
+logger = main_logger.getChild(PROG_NAME)
+
+# the relative frequencies of the annotation actions
+ACTIONS = (('assign', 10), ('remove', 2), ('add_sog', 5), ('delete_sog', 3))
+PAGE_LOADS = ('page', 'section', 'mcdict', 'body', 'concepts', 'page_total')
+PERCENTILES = (50, 90, 99)
+
+
+class Paper:
+    """What the client knows about the paper (the occurrences and the words)"""
+
+    def __init__(self, tree) -> None:
+        mi2idf = get_mi2idf(tree)
+        self.occurrences: list[tuple[str, str, str, str]] = []
+        self.words: dict[str, list[str]] = dict()
+
+        for mi_id, idf in mi2idf.items():
+            mi = tree.getroot().get_element_by_id(mi_id)
+            para = next(mi.iterancestors('p'))
+            if para.get('id') not in self.words:
+                self.words[para.get('id')] = [
+                    e.get('id') for e in para.iterchildren('span') if e.get('class') == 'gd_word'
+                ]
+            self.occurrences.append((mi_id, idf['idf_hex'], idf['idf_var'], para.get('id')))
+
+
+class Session:
+    """An annotator who loads the page and annotates random occurrences"""
+
+    def __init__(
+        self,
+        client,
+        paper: Paper,
+        assets: tuple,
+        lazy_sections: bool,
+        edit_rate: float,
+        reload_rate: float,
+        seed: int,
+    ) -> None:
+        self.client = client
+        self.paper = paper
+        self.assets = assets
+        self.lazy_sections = lazy_sections
+        self.edit_rate = edit_rate
+        self.reload_rate = reload_rate
+        self.rnd = random.Random(seed)
+
+        self.mcdict_edit_id = None
+        self.concepts: dict = dict()
+        self.sogs: list[tuple[str, str, str]] = []
+
+        self.latencies: defaultdict = defaultdict(list)
+        self.rejected: defaultdict = defaultdict(int)
+        self.errors = 0
+
+    def request(self, kind: str, method: str, path: str, **kwargs):
+        t0 = time.perf_counter()
+        response = self.client.open(path, method=method, **kwargs)
+        self.latencies[kind].append(time.perf_counter() - t0)
+
+        if response.status_code >= 400:
+            self.errors += 1
+        return response
+
+    def load_page(self) -> None:
+        t0 = time.perf_counter()
+        page = self.request('page', 'GET', '/')
+
+        # the client loads the placeholders of the shell page one by one
+        if self.lazy_sections:
+            for sec_id in lxml.html.fromstring(page.get_data()).xpath('//section[@data-lazy-section]/@id'):
+                self.request('section', 'GET', '/section/{}'.format(quote(sec_id)))
+
+        for kind, path in self.assets:
+            self.request(kind, 'GET', path)
+        data = json.loads(self.request('mcdict', 'GET', '/mcdict.json').get_data(as_text=True))
+        self.mcdict_edit_id, self.concepts = data[0], data[1]
+
+        self.latencies['page_total'].append(time.perf_counter() - t0)
+
+    def post(self, kind: str, path: str, form: dict) -> None:
+        form['mcdict_edit_id'] = self.mcdict_edit_id
+        self.request(kind, 'POST', path, data=form)
+
+        # a stale edit is rejected with a flash message (and the page is reloaded)
+        with self.client.session_transaction() as sess:
+            if sess.pop('_flashes', None):
+                self.rejected[kind] += 1
+                self.load_page()
+
+    def edit_mcdict(self) -> None:
+        _, idf_hex, idf_var, _ = self.rnd.choice(self.paper.occurrences)
+        form = {'idf_hex': idf_hex, 'idf_var': idf_var, 'description': 'load test', 'arity': '0'}
+        form.update({'affixes{}'.format(i): '' for i in range(10)})
+
+        cls = self.concepts[idf_hex][idf_var]
+        if len(cls) > 0 and self.rnd.random() < 0.5:
+            form['concept_id'] = str(self.rnd.randrange(len(cls)))
+            self.post('update_concept', '/_update_concept', form)
+        else:
+            self.post('new_concept', '/_new_concept', form)
+
+    def annotate(self) -> None:
+        kind = self.rnd.choices([a for a, _ in ACTIONS], [w for _, w in ACTIONS])[0]
+        mi_id, idf_hex, idf_var, para_id = self.rnd.choice(self.paper.occurrences)
+
+        if kind == 'delete_sog' and len(self.sogs) > 0:
+            mi_id, start_id, stop_id = self.sogs.pop(self.rnd.randrange(len(self.sogs)))
+            self.post(kind, '/_delete_sog', {'mi_id': mi_id, 'start_id': start_id, 'stop_id': stop_id})
+
+        elif kind in ('add_sog', 'delete_sog'):
+            words = self.paper.words[para_id]
+            start = self.rnd.randrange(len(words))
+            start_id, stop_id = words[start], words[min(start + self.rnd.randrange(1, 6), len(words) - 1)]
+            self.sogs.append((mi_id, start_id, stop_id))
+            self.post('add_sog', '/_add_sog', {'mi_id': mi_id, 'start_id': start_id, 'stop_id': stop_id})
+
+        elif kind == 'assign' and len(self.concepts[idf_hex][idf_var]) > 0:
+            concept_id = self.rnd.randrange(len(self.concepts[idf_hex][idf_var]))
+            self.post(kind, '/_concept', {'mi_id': mi_id, 'concept': str(concept_id)})
+
+        else:
+            self.post('remove', '/_remove_concept', {'mi_id': mi_id})
+
+    def run(self, nof_actions: int) -> None:
+        self.load_page()
+
+        for _ in range(nof_actions):
+            r = self.rnd.random()
+            if r < self.reload_rate:
+                self.load_page()
+            elif r < self.reload_rate + self.edit_rate:
+                self.edit_mcdict()
+            else:
+                self.annotate()
+
+
+def start_server(work_dir: Path, paper_id: str, lazy_sections: bool, static_body: bool):
+    from server.__main__ import app, routing_functions
+    from server.miogatto import MioGattoServer
+    from server.static_body import build_static_body
+
+    tree = lxml.html.parse(str(work_dir / 'sources' / '{}.html'.format(paper_id)))
+    anno_file, mcdict_file = data_files(work_dir / 'data', paper_id)
+
+    body_file = None
+    if static_body:
+        body_file = (work_dir / 'sources' / '{}.body.html'.format(paper_id)).absolute()
+        build_static_body(tree, body_file)
+
+    # keep the server logs away from the report
+    server_logger = logging.getLogger(PROG_NAME + '.server')
+    server_logger.disabled = True
+
+    server = MioGattoServer(
+        paper_id, tree, MiAnno(anno_file), McDict(mcdict_file), server_logger, lazy_sections, None, body_file
+    )
+    routing_functions(server)
+
+    return app, Paper(tree)
+
+
+def summarize(sessions: list[Session], elapsed: float) -> dict:
+    latencies: defaultdict = defaultdict(list)
+    rejected: defaultdict = defaultdict(int)
+    for s in sessions:
+        for kind, ts in s.latencies.items():
+            latencies[kind].extend(ts)
+        for kind, n in s.rejected.items():
+            rejected[kind] += n
+
+    # page_total spans the requests of a page load
+    nof_requests = sum(len(ts) for k, ts in latencies.items() if k != 'page_total')
+    actions = {k: len(ts) for k, ts in latencies.items() if k not in PAGE_LOADS}
+    nof_rejected = sum(rejected.values())
+
+    return {
+        'sessions': len(sessions),
+        'elapsed': elapsed,
+        'requests': nof_requests,
+        'errors': sum(s.errors for s in sessions),
+        'throughput': nof_requests / elapsed,
+        'latency': {
+            kind: dict(
+                zip(['p{}'.format(p) for p in PERCENTILES], np.percentile(ts, PERCENTILES).tolist()),
+                count=len(ts),
+                max=max(ts),
+            )
+            for kind, ts in sorted(latencies.items())
+        },
+        'stale_edits': {
+            'rejected': dict(rejected),
+            'total': nof_rejected,
+            'rate': nof_rejected / sum(actions.values()) if len(actions) > 0 else None,
+        },
+    }
+
+
+def main():
+    # parse options
+    args = docopt(HELP, version=VERSION)
+
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
+
+    concurrency, seed = int(args['--concurrency']), int(args['--seed'])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        profiler.phase('synthesis')
+        work_dir = Path(tmp_dir)
+        synthesize(work_dir, 'loadtest', sections=int(args['--sections']), seed=seed)
+
+        profiler.phase('start server')
+        app, paper = start_server(work_dir, 'loadtest', args['--lazy-sections'], args['--static-body'])
+
+        # each session has its own client (and cookies)
+        assets = (('body', '/body.html'), ('concepts', '/concepts.json')) if args['--static-body'] else ()
+        edit_rate, reload_rate = float(args['--edit-rate']), float(args['--reload-rate'])
+        sessions = [
+            Session(app.test_client(), paper, assets, args['--lazy-sections'], edit_rate, reload_rate, seed + i)
+            for i in range(concurrency)
+        ]
+
+        profiler.phase('load test')
+        logger.info('Running %d sessions', concurrency)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            for _ in executor.map(lambda s: s.run(int(args['--actions'])), sessions):
+                pass
+        report = summarize(sessions, time.perf_counter() - t0)
+
+    profiler.phase('output')
+    print('* Summary')
+    print('Sessions: {}'.format(report['sessions']))
+    print('Requests: {} ({} errors)'.format(report['requests'], report['errors']))
+    print('Throughput: {:.1f} req/s'.format(report['throughput']))
+    stale = report['stale_edits']
+    if stale['rate'] is not None:
+        print('Stale edits rejected: {} ({:.2f}%)'.format(stale['total'], stale['rate'] * 100))
+
+    print('* Latency')
+    print('request\tcount\t' + '\t'.join('p{} (ms)'.format(p) for p in PERCENTILES) + '\tmax (ms)')
+    for kind, lat in report['latency'].items():
+        row = [kind, lat['count']] + ['{:.2f}'.format(lat['p{}'.format(p)] * 1000) for p in PERCENTILES]
+        print(*row, '{:.2f}'.format(lat['max'] * 1000), sep='\t')
+
+    if args['--out'] is not None:
+        with open(args['--out'], 'w') as f:
+            json.dump(report, f, ensure_ascii=False, indent=4, sort_keys=True, separators=(',', ': '))
+
+
+if __name__ == '__main__':
+    main()
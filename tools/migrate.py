@@ -0,0 +1,155 @@
+# Data migration tool for MioGatto
+import sys
+import hashlib
+from docopt import docopt
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from lib.version import VERSION
+from lib.logger import main_logger, init_worker
+from lib.profiler import Profiler
+from lib.migration import LATEST, get_version, migrate
+from lib.validation import VALIDATORS
+from lib.annotation import STORAGES, get_storage, dump_json
+
+# meta
+PROG_NAME = "tools.migrate"
+HELP = """Data migration tool for MioGatto
+
+Usage:
+    {p} [options] DATA_DIR OUT_DIR
+
+Options:
+    -f FMT, --format=FMT
+                        Format of the data files (json or msgpack) [default: json]
+    --anno-version=VER  Target version of the anno files (the latest by default)
+    --mcdict-version=VER
+                        Target version of the mcdict files (the latest by default)
+    -j NUM, --jobs=NUM  Number of worker processes (0 for the number of CPUs) [default: 0]
+    -n, --dry-run       Migrate and validate without writing files
+    -r FILE, --report=FILE
+                        Write a report of each file as JSON ("-" for stdout)
+
+    --profile           Dump profile into {p}.prof
+    --profile-out=FILE  Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings           Show wall time of each phase
+    --memory            Show memory usage of each phase and top allocations
+    -D, --debug         Show debug messages
+    -q, --quiet         Show less messages
+    --log-json          Write log messages as JSON lines
+
+    -h, --help          Show this screen and exit
+    -V, --version       Show version
+""".format(
+    p=PROG_NAME
+)
+
+logger = main_logger.getChild(PROG_NAME)
+
+
+def data_kind(file: Path) -> str:
+    for kind in LATEST:
+        if file.stem.endswith('_' + kind):
+            return kind
+
+    raise ValueError('{}: Unknown kind of data file'.format(file))
+
+
+def migrate_file(file: Path, out_dir: Path, targets: dict, dry_run: bool) -> dict:
+    """Migrate a file and report the result (run in the worker processes)"""
+    kind = data_kind(file)
+    raw = file.read_bytes()
+    storage = get_storage(file)
+
+    report = {
+        'file': file.name,
+        'kind': kind,
+        'sha256_before': hashlib.sha256(raw).hexdigest(),
+        'sha256_after': None,
+        'issues': [],
+    }
+
+    try:
+        data = storage.load(file)
+        report['version_before'] = get_version(kind, data)
+        data, path = migrate(kind, data, targets[kind])
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        report.update(status='error', issues=[repr(e)])
+        return report
+
+    report['steps'] = ['{}->{}'.format(a, b) for a, b in zip(path, path[1:])]
+
+    # only the latest version can be validated
+    if path[-1] == LATEST[kind]:
+        report['issues'] = VALIDATORS[kind](data)
+        if len(report['issues']) > 0:
+            report['status'] = 'invalid'
+            return report
+
+    # keep the files as is if nothing to do
+    out = raw if len(path) == 1 else storage.dumps(data)
+    report['sha256_after'] = hashlib.sha256(out).hexdigest()
+    report['status'] = 'migrated' if len(path) > 1 else 'unchanged'
+
+    if not dry_run:
+        (out_dir / file.name).write_bytes(out)
+
+    return report
+
+
+def main():
+    # parse options
+    args = docopt(HELP, version=VERSION)
+
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
+
+    data_dir, out_dir = Path(args['DATA_DIR']), Path(args['OUT_DIR'])
+    dry_run = args['--dry-run']
+    targets = {'anno': args['--anno-version'], 'mcdict': args['--mcdict-version']}
+    jobs = int(args['--jobs']) or None
+
+    # dir validations
+    if not data_dir.is_dir():
+        logger.error('%s is not an existing dir', data_dir)
+        exit(1)
+
+    if not dry_run:
+        if out_dir.exists():
+            logger.error('%s already exists', out_dir)
+            exit(1)
+        out_dir.mkdir(parents=True)
+
+    suffix = STORAGES[args['--format']].suffix
+    files = sorted(f for kind in LATEST for f in data_dir.glob('*_{}{}'.format(kind, suffix)))
+
+    # process all data files
+    profiler.phase('migration')
+    n = len(files)
+    if jobs == 1:
+        reports = [migrate_file(f, out_dir, targets, dry_run) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=main_logger.settings) as executor:
+            reports = list(executor.map(migrate_file, files, [out_dir] * n, [targets] * n, [dry_run] * n))
+
+    profiler.phase('report')
+    for r in reports:
+        for issue in r['issues']:
+            logger.error('%s: %s', r['file'], issue)
+
+    summary = {s: sum(r['status'] == s for r in reports) for s in ('migrated', 'unchanged', 'invalid', 'error')}
+    logger.info(', '.join('{} {}'.format(v, k) for k, v in summary.items()))
+
+    if args['--report'] == '-':
+        dump_json({'dry_run': dry_run, 'summary': summary, 'files': reports}, sys.stdout)
+    elif args['--report'] is not None:
+        with open(args['--report'], 'w') as f:
+            dump_json({'dry_run': dry_run, 'summary': summary, 'files': reports}, f)
+
+    if summary['invalid'] + summary['error'] > 0:
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,18 @@
 # The preprocess tool for MioGatto
+import re
 import lxml.html
 import unicodedata
 from docopt import docopt
 from pathlib import Path
+from dataclasses import asdict
 
 from lib.version import VERSION
 from lib.logger import main_logger
-from lib.util import get_mi2idf
+from lib.profiler import Profiler
+from lib.util import get_mi2idf, compact_word_spans
 from lib.annotation import dump_json
+from lib.context import ContextIndex, context_file
+from lib.concept_dict import ConceptDict
 
 # meta
 PROG_NAME = "tools.preprocess"
@@ -19,12 +24,21 @@ Usage:
 Options:
     --embed-floats      Preserve embed figure/table codes
     --overwrite         Overwrite output files if already exist
+    --compact-words     Write word span tags in the compact form
+    --seed=FILE         Pre-seed the mcdict with the concepts in the dictionary
+                        built by tools.concepts
+    --seed-top=NUM      Number of concepts to pre-seed for each identifier [default: 3]
 
     -d DIR, --data=DIR  Dir for data outputs [default: ./templates]
     --sources=DIR       Dir for HTML outputs [default: ./sources]
 
+    --profile           Dump profile into {p}.prof
+    --profile-out=FILE  Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings           Show wall time of each phase
+    --memory            Show memory usage of each phase and top allocations
     -D, --debug         Show debug messages
     -q, --quiet         Show less messages
+    --log-json          Write log messages as JSON lines
 
     -h, --help          Show this screen and exit
     -V, --version       Show version
@@ -34,6 +48,9 @@ Options:
 
 logger = main_logger.getChild(PROG_NAME)
 
+# element ids of LaTeXML (e.g., S2.E3 and S1.p1.1.m1.1), which only make sense in their own paper
+ELEMENT_ID = re.compile(r'\b[A-Z]+\d+(?:\.[A-Za-z]*\d+)*\.[A-Za-z]+\d+(?:\.[A-Za-z]*\d+)*\b')
+
 
 def hex2surface(idf_hex):
     idf_text = bytes.fromhex(idf_hex).decode()
@@ -213,11 +230,36 @@ def idf2mc(idf_set):
     return {idf[0]: {'_surface': hex2surface(idf[0]), 'identifiers': {v: [] for v in idf[1]}} for idf in idf_sorted}
 
 
+def seed_mc(mcdict_concepts, concept_dict: ConceptDict, top: int) -> int:
+    """Fill the empty concept lists with the most frequent concepts in the corpus
+
+    The concepts referring to the elements of their papers are not seeded,
+    since the references would be dangling in the new paper.
+    """
+    nof_seeds = 0
+
+    for idf_hex, obj in mcdict_concepts.items():
+        for idf_var, cls in obj['identifiers'].items():
+            for c, _, _ in concept_dict.lookup(idf_hex, idf_var):
+                if len(cls) >= top:
+                    break
+                if ELEMENT_ID.search(c.description) is not None:
+                    logger.debug('Not seeding "%s" referring to another paper', c.description)
+                    continue
+
+                cls.append(asdict(c))
+                nof_seeds += 1
+
+    return nof_seeds
+
+
 def main():
     # parse options
     args = docopt(HELP, version=VERSION)
 
-    main_logger.set_logger(args['--quiet'], args['--debug'])
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
     embed_floats = args['--embed-floats']
 
     # dirs and files
@@ -245,11 +287,19 @@ def main():
             logger.error('Data files exist in %s. Use --overwrite to force', data_dir)
             exit(1)
 
+    if args['--seed'] is not None and not Path(args['--seed']).exists():
+        logger.error('Concept dictionary %s does not exist', args['--seed'])
+        exit(1)
+
     # load the HTML and modify the DOM tree
+    profiler.phase('parse')
     tree = lxml.html.parse(str(html_in))
+
+    profiler.phase('preprocess')
     preprocess_html(tree, paper_id, embed_floats)
 
     # extract formulae information
+    profiler.phase('mi extraction')
     occurences, identifiers, attribs = observe_mi(tree)
     print('#indentifiers: {}'.format(len(identifiers)))
     print('#occurences: {}'.format(len(occurences)))
@@ -264,7 +314,18 @@ def main():
         for mi_id, concept_id in occurences.items()
     }
 
+    # the index needs the word ids
+    profiler.phase('context index')
+    context_index = ContextIndex.build(tree)
+
     # write output files
+    profiler.phase('output')
+    logger.info('Writing context index to %s', context_file(sources_dir, paper_id))
+    context_index.dump(context_file(sources_dir, paper_id))
+
+    if args['--compact-words']:
+        compact_word_spans(tree.getroot())
+
     logger.info('Writing preprocessed HTML to %s', html_out)
     tree.write(str(html_out), pretty_print=True, encoding='utf-8')
 
@@ -279,13 +340,20 @@ def main():
             f,
         )
 
+    mcdict_concepts = idf2mc(identifiers)
+    if args['--seed'] is not None:
+        concept_dict = ConceptDict(Path(args['--seed']))
+        nof_seeds = seed_mc(mcdict_concepts, concept_dict, int(args['--seed-top']))
+        concept_dict.close()
+        logger.info('Pre-seeded %d concepts from %s', nof_seeds, args['--seed'])
+
     logger.info('Writing initialized mcdict template to %s', mcdict_json)
     with open(mcdict_json, 'w') as f:
         dump_json(
             {
                 '_author': 'YOUR NAME',
                 '_mcdict_version': '1.0',
-                'concepts': idf2mc(identifiers),
+                'concepts': mcdict_concepts,
             },
             f,
         )
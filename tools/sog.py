@@ -6,8 +6,9 @@ from pathlib import Path
 
 from lib.version import VERSION
 from lib.logger import main_logger
-from lib.util import get_mi2idf
-from lib.annotation import MiAnno, McDict
+from lib.profiler import Profiler
+from lib.util import get_mi2idf, expand_word_spans
+from lib.annotation import MiAnno, McDict, data_files
 
 # meta
 PROG_NAME = "tools.sog"
@@ -19,10 +20,17 @@ Usage:
 Options:
     -d DIR, --data=DIR  Dir for the gold data [default: ./data]
     --sources=DIR       Dir for preprocessed HTML [default: ./sources]
+    -f FMT, --format=FMT
+                        Format of the data files (json or msgpack) [default: json]
 
     -s, --show-sog      Show actual SoG by concept
+    --profile           Dump profile into {p}.prof
+    --profile-out=FILE  Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings           Show wall time of each phase
+    --memory            Show memory usage of each phase and top allocations
     -D, --debug         Show debug messages
     -q, --quiet         Show less messages
+    --log-json          Write log messages as JSON lines
 
     -h, --help          Show this screen and exit
     -V, --version       Show version
@@ -70,7 +78,9 @@ def main():
     # parse options
     args = docopt(HELP, version=VERSION)
 
-    main_logger.set_logger(args['--quiet'], args['--debug'])
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
     paper_id = args['ID']
 
     # dirs and files
@@ -79,17 +89,22 @@ def main():
     sources_dir = Path(args['--sources'])
     source_html = sources_dir / '{}.html'.format(paper_id)
 
-    anno_json = data_dir / '{}_anno.json'.format(paper_id)
-    mcdict_json = data_dir / '{}_mcdict.json'.format(paper_id)
+    anno_json, mcdict_json = data_files(data_dir, paper_id, args['--format'])
 
     # load the data
+    profiler.phase('parse')
     mi_anno = MiAnno(anno_json)
     mcdict = McDict(mcdict_json)
 
     # analyze and show the results
     tree = lxml.html.parse(str(source_html))
+    expand_word_spans(tree.getroot(), spaces=False)
+
+    profiler.phase('analysis')
     sog_by_concept = analyze_sog(tree, mi_anno, mcdict)
 
+    profiler.phase('output')
+
     print('* Metadata')
     print('Paper ID: {}'.format(paper_id))
     print('Author of math concept dict: {}'.format(mi_anno.annotator))
@@ -0,0 +1,128 @@
+# Storage conversion and benchmark tool for MioGatto
+import time
+from docopt import docopt
+from pathlib import Path
+
+from lib.version import VERSION
+from lib.logger import main_logger
+from lib.profiler import Profiler
+from lib.annotation import STORAGES, MiAnno, McDict, load_data, save_data
+
+# meta
+PROG_NAME = "tools.storage"
+HELP = """Storage conversion and benchmark tool for MioGatto
+
+Usage:
+    {p} convert [options] FILE...
+    {p} bench [options] FILE...
+
+Options:
+    -f FMT, --format=FMT
+                    Format to convert into (json or msgpack) [default: json]
+    -o DIR, --out=DIR
+                    Dir for converted files (the same dir as input by default)
+    -n NUM, --repeat=NUM
+                    Number of repetitions for benchmarks [default: 10]
+    --overwrite     Overwrite output files if already exist
+
+    --profile       Dump profile into {p}.prof
+    --profile-out=FILE
+                    Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings       Show wall time of each phase
+    --memory        Show memory usage of each phase and top allocations
+    -D, --debug     Show debug messages
+    -q, --quiet     Show less messages
+    --log-json      Write log messages as JSON lines
+
+    -h, --help      Show this screen and exit
+    -V, --version   Show version
+""".format(
+    p=PROG_NAME
+)
+
+logger = main_logger.getChild(PROG_NAME)
+
+
+def convert(file: Path, fmt: str, out_dir: Path, overwrite: bool) -> bool:
+    out_file = out_dir / (file.stem + STORAGES[fmt].suffix)
+
+    if out_file == file:
+        logger.warning('%s is already in %s format, skipping', file, fmt)
+        return True
+
+    if out_file.exists() and not overwrite:
+        logger.error('%s exists. Use --overwrite to force', out_file)
+        return False
+
+    data = load_data(file)
+    save_data(data, out_file)
+
+    # make sure the conversion is lossless
+    if load_data(out_file) != data:
+        logger.error('%s: Round-trip conversion failed', file)
+        return False
+
+    logger.info('Converted %s to %s', file, out_file)
+    return True
+
+
+def bench(file: Path, repeat: int, tmp_dir: Path) -> None:
+    loader = MiAnno if file.stem.endswith('_anno') else McDict
+    obj = loader(file)
+
+    print('* {}'.format(file))
+    print('format\tsize (bytes)\tload (ms)\tsave (ms)')
+    for fmt, storage in STORAGES.items():
+        tmp_file = tmp_dir / ('.bench_' + file.stem + storage.suffix)
+
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            obj.dump(tmp_file)
+        t_save = (time.perf_counter() - t0) / repeat * 1000
+
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            loader(tmp_file)
+        t_load = (time.perf_counter() - t0) / repeat * 1000
+
+        size = tmp_file.stat().st_size
+        tmp_file.unlink()
+
+        print(fmt, size, '{:.2f}'.format(t_load), '{:.2f}'.format(t_save), sep='\t')
+
+
+def main():
+    # parse options
+    args = docopt(HELP, version=VERSION)
+
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
+    files = [Path(f) for f in args['FILE']]
+
+    if args['convert']:
+        profiler.phase('convert')
+        fmt = args['--format']
+        if fmt not in STORAGES:
+            logger.critical('Unknown format: %s', fmt)
+            exit(1)
+
+        failed = 0
+        for file in files:
+            out_dir = Path(args['--out']) if args['--out'] is not None else file.parent
+            out_dir.mkdir(parents=True, exist_ok=True)
+            if not convert(file, fmt, out_dir, args['--overwrite']):
+                failed += 1
+
+        if failed > 0:
+            exit(1)
+
+    elif args['bench']:
+        profiler.phase('bench')
+        repeat = int(args['--repeat'])
+        for file in files:
+            bench(file, repeat, file.parent)
+
+
+if __name__ == '__main__':
+    main()
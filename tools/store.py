@@ -0,0 +1,132 @@
+# Corpus store tool for MioGatto
+import lxml.html
+from docopt import docopt
+from pathlib import Path
+
+from lib.version import VERSION
+from lib.logger import main_logger
+from lib.profiler import Profiler
+from lib.util import get_mi2idf
+from lib.store import CorpusStore
+from lib.annotation import MiAnno, McDict, data_files
+
+# meta
+PROG_NAME = "tools.store"
+HELP = """Corpus store tool for MioGatto
+
+Usage:
+    {p} import [options] [ID...]
+    {p} export [options] [ID...]
+    {p} occurrences [options] IDF [VAR]
+    {p} progress [options]
+
+Options:
+    -S FILE, --store=FILE
+                        SQLite file for the corpus [default: ./corpus.sqlite]
+    -d DIR, --data=DIR  Dir for the JSON data [default: ./data]
+    --sources=DIR       Dir for preprocessed HTML [default: ./sources]
+    -f FMT, --format=FMT
+                        Format of the data files (json or msgpack) [default: json]
+
+    -c NUM, --concept=NUM
+                        Limit occurrences to the concept ID
+    -b RATE, --below=RATE
+                        Show papers with progress rate below RATE (%)
+
+    --profile           Dump profile into {p}.prof
+    --profile-out=FILE  Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings           Show wall time of each phase
+    --memory            Show memory usage of each phase and top allocations
+    -D, --debug         Show debug messages
+    -q, --quiet         Show less messages
+    --log-json          Write log messages as JSON lines
+
+    -h, --help          Show this screen and exit
+    -V, --version       Show version
+""".format(
+    p=PROG_NAME
+)
+
+logger = main_logger.getChild(PROG_NAME)
+
+
+def import_paper(store: CorpusStore, paper_id: str, data_dir: Path, sources_dir: Path, fmt: str) -> None:
+    anno_file, mcdict_file = data_files(data_dir, paper_id, fmt)
+    source_html = sources_dir / '{}.html'.format(paper_id)
+
+    # identifiers are only available in the source HTML
+    if source_html.exists():
+        mi2idf = get_mi2idf(lxml.html.parse(str(source_html)))
+    else:
+        logger.warning('%s does not exist; identifiers of paper "%s" are unknown', source_html, paper_id)
+        mi2idf = dict()
+
+    store.save_anno(paper_id, MiAnno(anno_file).to_dict(), mi2idf)
+    store.save_mcdict(paper_id, McDict(mcdict_file).to_dict())
+    logger.info('Imported paper "%s"', paper_id)
+
+
+def export_paper(store: CorpusStore, paper_id: str, data_dir: Path, fmt: str) -> None:
+    anno_file, mcdict_file = data_files(data_dir, paper_id, fmt)
+
+    MiAnno.from_store(store, paper_id).dump(anno_file)
+    McDict.from_store(store, paper_id).dump(mcdict_file)
+    logger.info('Exported paper "%s"', paper_id)
+
+
+def main():
+    # parse options
+    args = docopt(HELP, version=VERSION)
+
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
+
+    data_dir = Path(args['--data'])
+    sources_dir = Path(args['--sources'])
+    fmt = args['--format']
+    store = CorpusStore(Path(args['--store']))
+
+    if args['import']:
+        profiler.phase('import')
+        paper_ids = args['ID']
+        if len(paper_ids) == 0:
+            suffix = '_anno' + data_files(data_dir, '', fmt)[0].suffix
+            paper_ids = sorted(f.name[: -len(suffix)] for f in data_dir.glob('*' + suffix))
+
+        for paper_id in paper_ids:
+            import_paper(store, paper_id, data_dir, sources_dir, fmt)
+
+    elif args['export']:
+        profiler.phase('export')
+        paper_ids = args['ID'] if len(args['ID']) > 0 else store.papers()
+        data_dir.mkdir(parents=True, exist_ok=True)
+
+        for paper_id in paper_ids:
+            if paper_id not in store:
+                logger.error('Paper "%s" is not in the store', paper_id)
+                continue
+            export_paper(store, paper_id, data_dir, fmt)
+
+    elif args['occurrences']:
+        profiler.phase('query')
+        idf_hex = args['IDF'].encode().hex()
+        concept_id = int(args['--concept']) if args['--concept'] is not None else None
+
+        print('paper\tmi_id\tvariation\tconcept')
+        for paper_id, mi_id, idf_var, c_id in store.find_occurrences(idf_hex, args['VAR'], concept_id):
+            print(paper_id, mi_id, idf_var, c_id, sep='\t')
+
+    elif args['progress']:
+        profiler.phase('query')
+        below = float(args['--below']) if args['--below'] is not None else None
+
+        print('paper\tdone\ttotal\trate')
+        for paper_id, nof_done, nof_anno in store.progress(below):
+            print(paper_id, nof_done, nof_anno, '{:.2f}%'.format(nof_done / nof_anno * 100), sep='\t')
+
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+# Synthetic paper generator for MioGatto
+import random
+import lxml.html
+from docopt import docopt
+from pathlib import Path
+
+from lib.version import VERSION
+from lib.logger import main_logger
+from lib.profiler import Profiler
+from lib.util import get_mi2idf
+from lib.annotation import data_files, save_data
+from lib.context import ContextIndex, context_file
+from tools.preprocess import preprocess_html, observe_mi, idf2mc
+
+# meta
+PROG_NAME = "tools.synth"
+HELP = """Synthetic paper generator for MioGatto
+
+Usage:
+    {p} [options] OUT_DIR
+
+Options:
+    -i ID, --id=ID      Paper ID [default: synth]
+    --sections=NUM      Number of sections [default: 10]
+    --paragraphs=NUM    Number of paragraphs in each section [default: 10]
+    --words=NUM         Number of words in each paragraph [default: 100]
+    --mi=NUM            Number of mi elements in each paragraph [default: 10]
+    --identifiers=NUM   Number of distinct identifiers [default: 50]
+    --concepts=NUM      Number of concepts for each identifier [default: 3]
+    --annotated=RATE    Rate of the annotated occurrences [default: 0.8]
+    --sog=RATE          Rate of the annotated occurrences with a SoG [default: 0.3]
+    --seed=NUM          Random seed [default: 0]
+
+    --profile           Dump profile into {p}.prof
+    --profile-out=FILE  Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings           Show wall time of each phase
+    --memory            Show memory usage of each phase and top allocations
+    -D, --debug         Show debug messages
+    -q, --quiet         Show less messages
+    --log-json          Write log messages as JSON lines
+
+    -h, --help          Show this screen and exit
+    -V, --version       Show version
+""".format(
+    p=PROG_NAME
+)
+
+logger = main_logger.getChild(PROG_NAME)
+
+VOCABULARY = (
+    'let be a the of and is for in we that with where to by as on this it from which are then there given any '
+    'function set space number vector matrix real integer value point map element sequence defined such each'
+).split()
+
+SYMBOLS = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZαβγδεζηθικλμνξπρστυφχψω'
+VARIANTS = ((None, 3), ('bold', 1), ('normal', 1))
+MATH = '<math id="{0}.m{1}" display="inline"><semantics><mi id="{0}.m{1}.1"{2}>{3}</mi></semantics></math>'
+AFFIXES = ((), ('subscript',), ('superscript',), ('prime',), ('hat',), ('subscript', 'superscript'))
+
+
+def gen_identifiers(n: int, rnd: random.Random) -> list[tuple[str, str]]:
+    variants = [v for v, w in VARIANTS for _ in range(w)]
+    pool = sorted({(s, v or '') for s in SYMBOLS for v in variants})
+    return rnd.sample(pool, min(n, len(pool)))
+
+
+def gen_html(sections: int, paragraphs: int, words: int, mis: int, identifiers: list, rnd: random.Random) -> str:
+    """Generate a LaTeXML-like HTML5 document (before preprocessing)"""
+    body = []
+
+    for s in range(1, sections + 1):
+        body.append('<section id="S{0}" class="ltx_section"><h2 class="ltx_title">{0} Section</h2>'.format(s))
+
+        for p in range(1, paragraphs + 1):
+            p_id = 'S{}.p{}.1'.format(s, p)
+            tokens = [rnd.choice(VOCABULARY) for _ in range(words)]
+
+            # put the math at random positions between the words
+            for i, pos in enumerate(sorted(rnd.sample(range(words + mis), mis)), 1):
+                symbol, var = rnd.choice(identifiers)
+                var_attr = ' mathvariant="{}"'.format(var) if var else ''
+                tokens.insert(pos, MATH.format(p_id, i, var_attr, symbol))
+
+            body.append(
+                '<div id="S{}.p{}" class="ltx_para"><p id="{}" class="ltx_p">{}.</p></div>'.format(
+                    s, p, p_id, ' '.join(tokens)
+                )
+            )
+
+        body.append('</section>')
+
+    return (
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Synthetic paper</title></head>\n'
+        '<body><article class="ltx_document">\n{}\n</article></body></html>\n'.format('\n'.join(body))
+    )
+
+
+def gen_mcdict(identifiers: set, concepts: int, rnd: random.Random) -> dict:
+    mcdict = idf2mc(identifiers)
+
+    for idf_hex, obj in mcdict.items():
+        for idf_var, cls in obj['identifiers'].items():
+            for i in range(concepts):
+                cls.append(
+                    {
+                        'description': '{} {} of {}'.format(rnd.choice(VOCABULARY), i, obj['_surface']['text']),
+                        'arity': rnd.choice((0, 0, 0, 1, 2)),
+                        'affixes': list(rnd.choice(AFFIXES)),
+                    }
+                )
+
+    return mcdict
+
+
+def gen_anno(tree, mcdict: dict, p_annotated: float, p_sog: float, rnd: random.Random) -> dict:
+    mi2idf = get_mi2idf(tree)
+    mi_anno = dict()
+
+    for mi in tree.getroot().iter('mi'):
+        mi_id, idf = mi.get('id'), mi2idf.get(mi.get('id'))
+        if mi_id is None or idf is None:
+            continue
+
+        anno: dict = {'concept_id': None, 'sog': []}
+        mi_anno[mi_id] = anno
+
+        cls = mcdict[idf['idf_hex']]['identifiers'][idf['idf_var']]
+        if len(cls) == 0 or rnd.random() >= p_annotated:
+            continue
+        anno['concept_id'] = rnd.randrange(len(cls))
+
+        # a few words in the same paragraph as the SoG
+        if rnd.random() < p_sog:
+            para = next(mi.iterancestors('p'))
+            words = [e.get('id') for e in para.iterchildren('span') if e.get('class') == 'gd_word']
+            start = rnd.randrange(len(words))
+            stop = min(start + rnd.randrange(1, 6), len(words) - 1)
+            anno['sog'].append({'start': words[start], 'stop': words[stop], 'type': rnd.randrange(3)})
+
+    return {'_anno_version': '1.0', '_annotator': 'synth', 'mi_anno': mi_anno}
+
+
+def synthesize(
+    out_dir: Path,
+    paper_id: str,
+    sections: int = 10,
+    paragraphs: int = 10,
+    words: int = 100,
+    mis: int = 10,
+    identifiers: int = 50,
+    concepts: int = 3,
+    p_annotated: float = 0.8,
+    p_sog: float = 0.3,
+    seed: int = 0,
+) -> None:
+    """Write a raw HTML, a preprocessed HTML and the annotated data in out_dir"""
+    rnd = random.Random(seed)
+    html = gen_html(sections, paragraphs, words, mis, gen_identifiers(identifiers, rnd), rnd)
+
+    sources_dir, data_dir = out_dir / 'sources', out_dir / 'data'
+    for d in (sources_dir, data_dir):
+        d.mkdir(parents=True, exist_ok=True)
+    (out_dir / '{}.html'.format(paper_id)).write_text(html, encoding='utf-8')
+
+    # the same as tools.preprocess
+    tree = lxml.html.fromstring(html.encode()).getroottree()
+    preprocess_html(tree, paper_id, True)
+    _, idf_set, _ = observe_mi(tree)
+
+    mcdict = gen_mcdict(idf_set, concepts, rnd)
+    anno = gen_anno(tree, mcdict, p_annotated, p_sog, rnd)
+
+    anno_file, mcdict_file = data_files(data_dir, paper_id)
+    save_data(anno, anno_file)
+    save_data({'_author': 'synth', '_mcdict_version': '1.0', 'concepts': mcdict}, mcdict_file)
+
+    ContextIndex.build(tree).dump(context_file(sources_dir, paper_id))
+    tree.write(str(sources_dir / '{}.html'.format(paper_id)), pretty_print=True, encoding='utf-8')
+
+
+def main():
+    # parse options
+    args = docopt(HELP, version=VERSION)
+
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
+
+    profiler.phase('synthesis')
+    synthesize(
+        Path(args['OUT_DIR']),
+        args['--id'],
+        int(args['--sections']),
+        int(args['--paragraphs']),
+        int(args['--words']),
+        int(args['--mi']),
+        int(args['--identifiers']),
+        int(args['--concepts']),
+        float(args['--annotated']),
+        float(args['--sog']),
+        int(args['--seed']),
+    )
+    logger.info('Wrote paper "%s" to %s', args['--id'], args['OUT_DIR'])
+
+
+if __name__ == '__main__':
+    main()
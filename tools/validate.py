@@ -0,0 +1,124 @@
+# Data validation tool for MioGatto
+import sys
+import lxml.html
+from docopt import docopt
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from lib.version import VERSION
+from lib.logger import main_logger, init_worker
+from lib.profiler import Profiler
+from lib.util import get_mi2idf, expand_word_spans
+from lib.validation import SourceIndex, validate_anno, validate_mcdict, validate_references
+from lib.annotation import load_data, data_files, dump_json
+
+# meta
+PROG_NAME = "tools.validate"
+HELP = """Data validation tool for MioGatto
+
+Usage:
+    {p} [options] [ID...]
+
+Options:
+    -d DIR, --data=DIR  Dir for the data [default: ./data]
+    --sources=DIR       Dir for preprocessed HTML [default: ./sources]
+    -f FMT, --format=FMT
+                        Format of the data files (json or msgpack) [default: json]
+    -j NUM, --jobs=NUM  Number of worker processes (0 for the number of CPUs) [default: 0]
+    -r FILE, --report=FILE
+                        Write the issues of each paper as JSON ("-" for stdout)
+
+    --profile           Dump profile into {p}.prof
+    --profile-out=FILE  Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings           Show wall time of each phase
+    --memory            Show memory usage of each phase and top allocations
+    -D, --debug         Show debug messages
+    -q, --quiet         Show less messages
+    --log-json          Write log messages as JSON lines
+
+    -h, --help          Show this screen and exit
+    -V, --version       Show version
+""".format(
+    p=PROG_NAME
+)
+
+logger = main_logger.getChild(PROG_NAME)
+
+
+def validate_paper(paper_id: str, data_dir: Path, sources_dir: Path, fmt: str) -> list[str]:
+    """Find all issues of a paper (run in the worker processes)"""
+    anno_file, mcdict_file = data_files(data_dir, paper_id, fmt)
+    source_html = sources_dir / '{}.html'.format(paper_id)
+
+    for f in (anno_file, mcdict_file, source_html):
+        if not f.exists():
+            return ['{} does not exist'.format(f)]
+
+    try:
+        anno, mcdict = load_data(anno_file), load_data(mcdict_file)
+    except ValueError as e:
+        return ['Cannot load the data: {}'.format(e)]
+
+    # the references of malformed data cannot be checked
+    issues = validate_anno(anno) + validate_mcdict(mcdict)
+    if len(issues) > 0:
+        return issues
+
+    # an unexpected error should not abort the report of the other papers
+    try:
+        tree = lxml.html.parse(str(source_html))
+        expand_word_spans(tree.getroot(), spaces=False)
+        index = SourceIndex(tree, get_mi2idf(tree))
+        return validate_references(anno, mcdict, index)
+    except Exception as e:
+        return ['Failed to validate: {}: {}'.format(type(e).__name__, e)]
+
+
+def main():
+    # parse options
+    args = docopt(HELP, version=VERSION)
+
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
+
+    data_dir = Path(args['--data'])
+    sources_dir = Path(args['--sources'])
+    fmt = args['--format']
+    jobs = int(args['--jobs']) or None
+
+    paper_ids = args['ID']
+    if len(paper_ids) == 0:
+        suffix = data_files(data_dir, '', fmt)[0].name
+        paper_ids = sorted(f.name[: -len(suffix)] for f in data_dir.glob('*' + suffix))
+
+    # validate the papers
+    profiler.phase('validation')
+    n = len(paper_ids)
+    if jobs == 1:
+        results = [validate_paper(p, data_dir, sources_dir, fmt) for p in paper_ids]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=main_logger.settings) as executor:
+            results = list(executor.map(validate_paper, paper_ids, [data_dir] * n, [sources_dir] * n, [fmt] * n))
+
+    profiler.phase('report')
+    report = dict(zip(paper_ids, results))
+    for paper_id, issues in report.items():
+        for issue in issues:
+            logger.error('%s: %s', paper_id, issue)
+
+    nof_invalid = sum(len(issues) > 0 for issues in results)
+    logger.info('%d of %d papers have issues', nof_invalid, n)
+
+    if args['--report'] == '-':
+        dump_json(report, sys.stdout)
+    elif args['--report'] is not None:
+        with open(args['--report'], 'w') as f:
+            dump_json(report, f)
+
+    if nof_invalid > 0:
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# Word span markup conversion tool for MioGatto
+import lxml.html
+from docopt import docopt
+from pathlib import Path
+
+from lib.version import VERSION
+from lib.logger import main_logger
+from lib.profiler import Profiler
+from lib.util import compact_word_spans, expand_word_spans
+from lib.annotation import MiAnno, data_files
+
+# meta
+PROG_NAME = "tools.words"
+HELP = """Word span markup conversion tool for MioGatto
+
+Usage:
+    {p} compact [options] HTML...
+    {p} expand [options] HTML...
+
+Options:
+    -d DIR, --data=DIR  Check the SoG references of the data in DIR
+    -f FMT, --format=FMT
+                        Format of the data files (json or msgpack) [default: json]
+
+    --profile           Dump profile into {p}.prof
+    --profile-out=FILE  Dump profile (cProfile stats, or collapsed stacks for *.folded)
+    --timings           Show wall time of each phase
+    --memory            Show memory usage of each phase and top allocations
+    -D, --debug         Show debug messages
+    -q, --quiet         Show less messages
+    --log-json          Write log messages as JSON lines
+
+    -h, --help          Show this screen and exit
+    -V, --version       Show version
+""".format(
+    p=PROG_NAME
+)
+
+logger = main_logger.getChild(PROG_NAME)
+
+
+def word_ids(tree) -> list:
+    return [e.attrib.get('id') for e in tree.getroot().xpath('//span[@class="gd_word"]')]
+
+
+def check_sog(mi_anno: MiAnno, w_ids: set) -> int:
+    nof_errors = 0
+
+    for mi_id, anno in mi_anno.occr.items():
+        for sog in anno['sog']:
+            for w_id in (sog['start'], sog['stop']):
+                if w_id not in w_ids:
+                    logger.error('SoG of %s refers to the unknown word %s', mi_id, w_id)
+                    nof_errors += 1
+
+    return nof_errors
+
+
+def convert(html: Path, compact: bool, data_dir, fmt: str) -> bool:
+    tree = lxml.html.parse(str(html))
+
+    # the word ids must be preserved through the conversion
+    expand_word_spans(tree.getroot())
+    w_ids = word_ids(tree)
+
+    if compact:
+        compact_word_spans(tree.getroot())
+        check_tree = lxml.html.fromstring(lxml.html.tostring(tree, encoding='utf-8')).getroottree()
+        expand_word_spans(check_tree.getroot())
+
+        if word_ids(check_tree) != w_ids:
+            logger.error('Word ids of %s are not preserved; left unchanged', html)
+            return False
+
+    if data_dir is not None:
+        anno_file = data_files(data_dir, html.stem, fmt)[0]
+        if anno_file.exists() and check_sog(MiAnno(anno_file), set(w_ids)) > 0:
+            logger.error('%s has broken SoG references; left unchanged', html)
+            return False
+
+    tree.write(str(html), pretty_print=True, encoding='utf-8')
+    logger.info('Converted %s', html)
+
+    return True
+
+
+def main():
+    # parse options
+    args = docopt(HELP, version=VERSION)
+
+    main_logger.set_logger(args['--quiet'], args['--debug'], args['--log-json'])
+    profiler = Profiler.from_args(args, PROG_NAME)
+    profiler.start()
+
+    data_dir = Path(args['--data']) if args['--data'] is not None else None
+
+    profiler.phase('convert')
+    results = [convert(Path(html), args['compact'], data_dir, args['--format']) for html in args['HTML']]
+
+    if not all(results):
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()